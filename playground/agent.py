@@ -14,7 +14,12 @@ Key features:
 - DistilBERT for text encoding (frozen parameters)
 - PPO with clipped objective and GAE-Lambda advantage estimation
 - Combined text and game state features
-- Automatic action masking for invalid choices
+- Action masking for invalid choices, taken from the env's `action_mask`
+- Accepts pre-tokenized observations from envs built with `tokenize=True`
+- Accepts string table ids from envs built with `intern=True`
+- Accepts the reused float32 vectors of `FlatObservation`; on CPU the items
+  tensor shares their memory
+- Rollouts stored as flat numpy columns rather than observation dicts
 """
 
 import gc
@@ -24,46 +29,109 @@ import torch.nn as nn
 import torch.optim as optim
 from transformers import DistilBertTokenizer, DistilBertModel
 from torch.distributions import Categorical
+from flat_observation import as_record
+from strings import get_string_table
+from tokens import get_token_cache
 
 
-class RolloutBuffer:
-    """Stores trajectories collected during agent rollouts."""
+def token_batch(input_ids, attention_mask):
+    """Tensors for pre-tokenized passages, trimmed to the longest passage."""
+    length = max(int(attention_mask.sum(axis=1).max()), 1)
+    return {
+        "input_ids": torch.from_numpy(input_ids[:, :length].astype(np.int64)),
+        "attention_mask": torch.from_numpy(attention_mask[:, :length].astype(np.int64)),
+    }
+
 
-    def __init__(self):
-        self.states = []
+class RolloutBuffer:
+    """Stores trajectories collected during agent rollouts.
+
+    Observations are copied into flat numpy columns instead of being kept
+    as dicts. Passages are stored as string table ids and tokenized again
+    through the token cache when a batch is built, so a step costs a few
+    dozen bytes whatever the passage length.
+    """
+
+    # Choices are covered by the action mask; tokens are rebuilt from the text id
+    _choice_fields = ("choices", "choice_ids", "history")
+    _token_fields = ("input_ids", "attention_mask")
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.strings = get_string_table()
+        self.observations = {}
+        self.size = 0
         self.actions = []
         self.rewards = []
-        self.next_states = []
         self.dones = []
         self.log_probs = []
         self.values = []
 
+    def __len__(self):
+        return self.size
+
     def clear(self):
         """Clears all stored trajectories."""
-        self.states.clear()
+        self.size = 0
         self.actions.clear()
         self.rewards.clear()
-        self.next_states.clear()
         self.dones.clear()
         self.log_probs.clear()
         self.values.clear()
 
-    def add(self, state, action, reward, next_state, done, log_prob, value):
+    def add(self, state, action, reward, done, log_prob, value):
         """Adds a single transition."""
-        self.states.append(state)
+        if self.size == self.capacity:
+            self._grow()
+        if isinstance(state, np.ndarray):
+            # FlatObservation vector, overwritten next step; columns take copies
+            record = as_record(state)
+            state = {name: record[name][0] for name in record.dtype.names}
+            state["text_id"] = int(state["text_id"])
+        has_text = "text" in state or "text_id" in state
+        for key, field in state.items():
+            if key in self._choice_fields:
+                continue
+            if has_text and key in self._token_fields:
+                continue
+            if key == "text":
+                key, field = "text_id", self.strings.intern(field)
+            self._column(key, field)[self.size] = field
+        self.size += 1
         self.actions.append(action)
         self.rewards.append(reward)
-        self.next_states.append(next_state)
         self.dones.append(done)
         self.log_probs.append(log_prob)
         self.values.append(value)
 
+    def _column(self, key, field):
+        column = self.observations.get(key)
+        if column is None:
+            field = np.asarray(field)
+            column = self.observations[key] = np.empty(
+                (self.capacity, *field.shape), dtype=field.dtype
+            )
+        return column
+
+    def _grow(self):
+        self.capacity *= 2
+        for key, column in self.observations.items():
+            grown = np.empty((self.capacity, *column.shape[1:]), dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            self.observations[key] = grown
+
+    def batch(self):
+        """Stored observations as one batched dict, like a vector env's."""
+        return {key: column[: self.size] for key, column in self.observations.items()}
+
 
 class ActorCritic(nn.Module):
     """Neural network implementing both actor and critic networks.
     Uses DistilBERT for text processing."""
 
-    def __init__(self, model_name="distilbert-base-uncased", hidden_size=128):
+    def __init__(
+        self, model_name="distilbert-base-uncased", hidden_size=128, num_actions=4
+    ):
         super(ActorCritic, self).__init__()
         self.bert = DistilBertModel.from_pretrained(
             model_name, torch_dtype=torch.float16
@@ -89,7 +157,7 @@ class ActorCritic(nn.Module):
             nn.ReLU(),
             nn.LayerNorm(64),
             nn.Dropout(0.1),
-            nn.Linear(64, 4),
+            nn.Linear(64, num_actions),
             nn.Softmax(dim=-1),
         )
 
@@ -105,17 +173,21 @@ class ActorCritic(nn.Module):
     @torch.autocast(device_type="cuda")
     def forward(self, text_batch, stats, items):
         """Process text and game state features."""
-        if isinstance(text_batch, str):
-            text_batch = [text_batch]
-
-        # Tokenize text
-        tokens = self.tokenizer(
-            text_batch,
-            return_tensors="pt",
-            max_length=256,
-            truncation=True,
-            padding=True,
-        )
+        if isinstance(text_batch, dict):
+            # Already tokenized by the environment
+            tokens = text_batch
+        else:
+            if isinstance(text_batch, str):
+                text_batch = [text_batch]
+
+            # Tokenize text
+            tokens = self.tokenizer(
+                text_batch,
+                return_tensors="pt",
+                max_length=256,
+                truncation=True,
+                padding=True,
+            )
 
         # Move to device
         device = next(self.bert.parameters()).device
@@ -144,11 +216,12 @@ class ShrineAgent:
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         torch.backends.cudnn.benchmark = True
 
-        self.policy = ActorCritic().to(self.device)
+        self.policy = ActorCritic(num_actions=action_size).to(self.device)
         self.optimizer = optim.AdamW(self.policy.parameters(), lr=0.0003)
         self.scaler = torch.amp.GradScaler()  # type: ignore
 
         self.memory = RolloutBuffer()
+        self.strings = get_string_table()
 
         # PPO hyperparameters
         self.gamma = 0.98
@@ -163,21 +236,69 @@ class ShrineAgent:
     @torch.no_grad()
     def get_state_representation(self, observation):
         """Convert observation to tensors."""
-        text = observation["text"]
+        if isinstance(observation, np.ndarray):
+            # FlatObservation vector: fields are views of its float32 buffer,
+            # kept float32 so no conversion copy is made
+            record = as_record(observation)
+            text = self.interned_batch([int(record["text_id"][0])])
+            return text, torch.from_numpy(record["items"]).to(self.device)
+        text = self.text_batch([observation])
         items_array = np.array([observation["items"]])
         items = torch.tensor(items_array, dtype=torch.float16, device=self.device)
         return text, items
 
+    def text_batch(self, observations):
+        """Passages of a list of observations, as text or token tensors."""
+        if "input_ids" in observations[0]:
+            return token_batch(
+                np.stack([obs["input_ids"] for obs in observations]),
+                np.stack([obs["attention_mask"] for obs in observations]),
+            )
+        if "text_id" in observations[0]:
+            return self.interned_batch([obs["text_id"] for obs in observations])
+        return [obs["text"] for obs in observations]
+
+    def batched_text(self, batch):
+        """Passages of a batched observation dict, as text or token tensors."""
+        if "input_ids" in batch:
+            return token_batch(batch["input_ids"], batch["attention_mask"])
+        if "text_id" in batch:
+            return self.interned_batch(batch["text_id"])
+        return batch["text"]
+
+    def interned_batch(self, text_ids):
+        """Token tensors for passages given as string table ids."""
+        cache = get_token_cache()
+        tokens = [cache.encode(self.strings[i]) for i in text_ids]
+        return token_batch(
+            np.stack([input_ids for input_ids, _ in tokens]),
+            np.stack([attention_mask for _, attention_mask in tokens]),
+        )
+
+    def action_mask(self, observations, num_actions):
+        """Float mask of the choices each observation offers."""
+        if isinstance(observations[0], np.ndarray):
+            mask = np.concatenate(
+                [as_record(obs)["action_mask"] for obs in observations]
+            )
+            return torch.from_numpy(mask).to(self.device)
+        if "action_mask" in observations[0]:
+            mask = np.stack([obs["action_mask"] for obs in observations])
+            return torch.from_numpy(mask).to(self.device, torch.float32)
+        num_choices = torch.tensor(
+            [len(obs["choices"]) for obs in observations], device=self.device
+        )
+        slots = torch.arange(num_actions, device=self.device)
+        return (slots[None, :] < num_choices[:, None]).float()
+
     @torch.no_grad()
     def act(self, observation):
         """Select an action using the policy."""
         text, items = self.get_state_representation(observation)
         action_probs, value = self.policy(text, items, items)
 
-        # Improve action masking
-        num_choices = len(observation["choices"])
-        mask = torch.zeros_like(action_probs)
-        mask[0, :num_choices] = 1
+        # Mask out choices the story does not offer
+        mask = self.action_mask([observation], action_probs.shape[1])
 
         # Add small epsilon to prevent zero probabilities
         masked_probs = action_probs * mask + 1e-8
@@ -193,6 +314,36 @@ class ShrineAgent:
 
         return action.item(), dist.log_prob(action), value
 
+    @torch.no_grad()
+    def act_batch(self, observations):
+        """Select one action per env from a batched vector-env observation."""
+        items = torch.tensor(
+            observations["items"], dtype=torch.float16, device=self.device
+        )
+        text = self.batched_text(observations)
+        action_probs, values = self.policy(text, items, items)
+
+        # Mask out choices each env does not offer
+        if "action_mask" in observations:
+            mask = torch.from_numpy(observations["action_mask"]).to(
+                self.device, torch.float32
+            )
+        else:
+            num_choices = torch.tensor(
+                [len(choices) for choices in observations["choices"]],
+                device=self.device,
+            )
+            slots = torch.arange(action_probs.shape[1], device=self.device)
+            mask = (slots[None, :] < num_choices[:, None]).float()
+
+        masked_probs = action_probs * mask + 1e-8
+        masked_probs = masked_probs / masked_probs.sum(dim=1, keepdim=True)
+
+        dist = Categorical(masked_probs)
+        actions = dist.sample()
+
+        return actions.cpu().numpy(), dist.log_prob(actions), values
+
     def update(self, entropy_coef=0.01):
         """Update policy using PPO."""
         returns = []
@@ -226,19 +377,22 @@ class ShrineAgent:
         # Normalize advantages
         advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
 
+        # Prepare batch
+        batch = self.memory.batch()
+        text_batch = self.batched_text(batch)
+        items_batch = torch.from_numpy(batch["items"]).to(self.device, torch.float16)
+        actions_batch = torch.tensor(self.memory.actions, device=self.device)
+        # Same masking as when acting, so old and new log-probs match
+        mask = torch.from_numpy(batch["action_mask"]).to(self.device, torch.float32)
+
         # PPO update loop
         for _ in range(self.ppo_epochs):
-            # Prepare batch
-            text_batch = [s["text"] for s in self.memory.states]
-            items_array = np.array([s["items"] for s in self.memory.states])
-            items_batch = torch.tensor(
-                items_array, dtype=torch.float16, device=self.device
-            )
-            actions_batch = torch.tensor(self.memory.actions, device=self.device)
-
             # Get new probabilities and values
             action_probs, values = self.policy(text_batch, items_batch, items_batch)
-            dist = Categorical(action_probs)
+
+            masked_probs = action_probs * mask + 1e-8
+            masked_probs = masked_probs / masked_probs.sum(dim=1, keepdim=True)
+            dist = Categorical(masked_probs)
             new_log_probs = dist.log_prob(actions_batch)
             entropy = dist.entropy().mean()
 
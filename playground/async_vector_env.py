@@ -0,0 +1,415 @@
+"""
+Multiprocess vector environment with shared-memory observation buffers.
+
+Each worker process owns a contiguous slice of `ReinforcedShrineAdventureEnv`
+instances, so the Python-level story stepping and reward scanning is spread
+over all cores instead of keeping a single one busy.
+
+The module includes:
+- ShrineAsyncVectorEnv: Worker-pool vector env, interface-compatible with ShrineVectorEnv
+
+Data flow per step:
+- Actions, items, attributes, rewards, terminations, truncations and choice counts live in
+  `multiprocessing.shared_memory` arrays that every process maps directly
+- Text (passage and choices) goes through a compact side channel: one
+  separator-joined UTF-8 blob per worker and step
+- Per-env infos follow the text as one pickled message, or None when no
+  env reported any, and are merged in the parent
+- Command messages carry no payload beyond the command name, seeds and
+  reset options
+
+Key features:
+- Same-step auto-reset, with the final observation and info in
+  `infos["final_obs"]` and `infos["final_info"]`
+- Infos merged with the `_key` mask convention, identical to ShrineVectorEnv's
+- Workers step their envs in parallel; the parent only decodes text
+- Reset options reach every sub-environment, as in ShrineVectorEnv
+
+Run from the repository root to check it against ShrineVectorEnv:
+    python playground/async_vector_env.py
+"""
+
+import argparse
+import functools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+from env import (
+    ATTRIBUTE_NAMES,
+    ITEM_NAMES,
+    ReinforcedShrineAdventureEnv,
+    action_masks,
+)
+
+# Separators for the text side channel; neither appears in the story
+FIELD_SEP = "\x1f"
+RECORD_SEP = "\x1e"
+
+
+def _buffer_specs(num_envs):
+    """Shapes and dtypes of every shared-memory buffer."""
+    return {
+        "actions": ((num_envs,), np.int32),
+        "items": ((num_envs, len(ITEM_NAMES)), np.float16),
+        "final_items": ((num_envs, len(ITEM_NAMES)), np.float16),
+        "attributes": ((num_envs, len(ATTRIBUTE_NAMES)), np.float32),
+        "final_attributes": ((num_envs, len(ATTRIBUTE_NAMES)), np.float32),
+        "rewards": ((num_envs,), np.float32),
+        "terminations": ((num_envs,), np.bool_),
+        "truncations": ((num_envs,), np.bool_),
+        "num_choices": ((num_envs,), np.int32),
+    }
+
+
+def _attach(blocks, num_envs):
+    """Map each shared-memory block to a numpy array."""
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+        for name, (shape, dtype) in _buffer_specs(num_envs).items()
+    }
+
+
+def _encode(observation):
+    """Pack an observation's text and choices into one record."""
+    return FIELD_SEP.join([observation["text"], *observation["choices"]])
+
+
+def _worker(conn, block_names, num_envs, start, stop, env_fn):
+    """Worker loop: step envs[start:stop] and write results to shared memory."""
+    blocks = {
+        name: shared_memory.SharedMemory(name=block_name)
+        for name, block_name in block_names.items()
+    }
+    buffers = _attach(blocks, num_envs)
+    envs = [env_fn() for _ in range(start, stop)]
+
+    try:
+        while True:
+            command, payload = conn.recv()
+
+            if command == "reset":
+                seeds, options = payload
+                records = []
+                infos = []
+                for i, (env, seed) in enumerate(zip(envs, seeds), start):
+                    observation, info = env.reset(seed=seed, options=options)
+                    buffers["items"][i] = observation["items"]
+                    buffers["attributes"][i] = observation["attributes"]
+                    buffers["num_choices"][i] = len(observation["choices"])
+                    records.append(_encode(observation))
+                    infos.append((info, None))
+                conn.send_bytes(RECORD_SEP.join(records).encode("utf-8"))
+                conn.send(infos if any(info for info, _ in infos) else None)
+
+            elif command == "step":
+                records = []
+                finals = []
+                infos = []
+                for i, env in enumerate(envs, start):
+                    observation, reward, terminated, truncated, info = env.step(
+                        int(buffers["actions"][i])
+                    )
+                    final_info = None
+                    buffers["rewards"][i] = reward
+                    buffers["terminations"][i] = terminated
+                    buffers["truncations"][i] = truncated
+
+                    if terminated or truncated:
+                        buffers["final_items"][i] = observation["items"]
+                        buffers["final_attributes"][i] = observation["attributes"]
+                        finals.append(_encode(observation))
+                        final_info = info
+                        observation, info = env.reset()
+                    else:
+                        finals.append("")
+                    infos.append((info, final_info))
+
+                    buffers["items"][i] = observation["items"]
+                    buffers["attributes"][i] = observation["attributes"]
+                    buffers["num_choices"][i] = len(observation["choices"])
+                    records.append(_encode(observation))
+                conn.send_bytes(RECORD_SEP.join(records + finals).encode("utf-8"))
+                conn.send(infos if any(any(pair) for pair in infos) else None)
+
+            elif command == "close":
+                break
+    finally:
+        for env in envs:
+            env.close()
+        del buffers
+        for block in blocks.values():
+            block.close()
+        conn.close()
+
+
+class ShrineAsyncVectorEnv(VectorEnv):
+    """Vector environment whose sub-environments run in a pool of worker processes."""
+
+    metadata = {"render.modes": []}
+
+    def __init__(
+        self,
+        num_envs: int,
+        num_workers: int | None = None,
+        env_fn=ReinforcedShrineAdventureEnv,
+        context=None,
+    ):
+        super().__init__()
+        num_workers = min(num_workers or mp.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+
+        probe = env_fn()
+        self.single_observation_space = probe.observation_space
+        self.single_action_space = probe.action_space
+        probe.close()
+        if "history" in self.single_observation_space.spaces:
+            raise ValueError(
+                "Passage history is not carried over shared memory; "
+                "use ShrineVectorEnv for envs with history_size > 0"
+            )
+        if "frame" in self.single_observation_space.spaces:
+            raise ValueError(
+                "Rendered frames are not carried over shared memory; "
+                "use ShrineVectorEnv for envs with frame_size"
+            )
+        if "text_id" in self.single_observation_space.spaces:
+            raise ValueError(
+                "String ids are only valid in the process that interned them; "
+                "use ShrineVectorEnv for envs with intern=True"
+            )
+        if "text" not in self.single_observation_space.spaces:
+            raise ValueError(
+                "Token observations are not carried over shared memory; "
+                "use ShrineVectorEnv for envs with tokenize=True"
+            )
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        # Action masks are rebuilt in the parent from the shared choice counts
+        self._max_choices = int(self.single_action_space.n)
+        self._action_masks = action_masks(self._max_choices)
+
+        # Allocate the shared buffers in the parent; workers attach by name
+        self._blocks = {
+            name: shared_memory.SharedMemory(
+                create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            )
+            for name, (shape, dtype) in _buffer_specs(num_envs).items()
+        }
+        self._buffers = _attach(self._blocks, num_envs)
+        block_names = {name: block.name for name, block in self._blocks.items()}
+
+        # Split the envs into contiguous, near-equal slices
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self._slices = list(zip(bounds[:-1], bounds[1:]))
+
+        ctx = mp.get_context(context)
+        self._conns = []
+        self._processes = []
+        for start, stop in self._slices:
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(child_conn, block_names, num_envs, start, stop, env_fn),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    def reset(self, *, seed=None, options=None):
+        """Reset every sub-environment and return the stacked observations."""
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            conn.send(("reset", (seeds[start:stop], options)))
+
+        texts, choices = [], []
+        env_infos = []
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            records = conn.recv_bytes().decode("utf-8").split(RECORD_SEP)
+            self._decode(records, texts, choices)
+            self._receive_infos(conn, stop - start, env_infos)
+
+        infos = {}
+        for i, (info, _) in enumerate(env_infos):
+            infos = self._add_info(infos, info, i)
+        return self._observation(texts, choices), infos
+
+    def step(self, actions):
+        """Step every sub-environment once, auto-resetting finished ones."""
+        self._buffers["actions"][:] = actions
+        for conn in self._conns:
+            conn.send(("step", None))
+
+        texts, choices = [], []
+        final_texts, final_choices = [], []
+        env_infos = []
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            records = conn.recv_bytes().decode("utf-8").split(RECORD_SEP)
+            count = stop - start
+            self._decode(records[:count], texts, choices)
+            self._decode(records[count:], final_texts, final_choices)
+            self._receive_infos(conn, count, env_infos)
+
+        # Merged in the order ShrineVectorEnv merges them, so the infos match
+        buffers = self._buffers
+        final_mask = buffers["terminations"] | buffers["truncations"]
+        infos = {}
+        for i, (info, final_info) in enumerate(env_infos):
+            if final_mask[i]:
+                final_obs = {
+                    "text": final_texts[i],
+                    "choices": final_choices[i],
+                    "items": buffers["final_items"][i].copy(),
+                    "attributes": buffers["final_attributes"][i].copy(),
+                    "action_mask": self._action_masks[
+                        min(len(final_choices[i]), self._max_choices)
+                    ],
+                }
+                infos = self._add_info(
+                    infos, {"final_obs": final_obs, "final_info": final_info or {}}, i
+                )
+            infos = self._add_info(infos, info, i)
+
+        return (
+            self._observation(texts, choices),
+            buffers["rewards"].copy(),
+            buffers["terminations"].copy(),
+            buffers["truncations"].copy(),
+            infos,
+        )
+
+    @property
+    def num_choices(self):
+        """Number of choices each sub-environment currently offers."""
+        return self._buffers["num_choices"].copy()
+
+    @staticmethod
+    def _receive_infos(conn, count, env_infos):
+        """Append a worker's (info, final_info) pairs; None stands for all empty."""
+        infos = conn.recv()
+        env_infos.extend(infos if infos is not None else [({}, None)] * count)
+
+    @staticmethod
+    def _decode(records, texts, choices):
+        """Split side-channel records back into texts and choice lists."""
+        for record in records:
+            text, *record_choices = record.split(FIELD_SEP)
+            texts.append(text)
+            choices.append(record_choices)
+
+    def _observation(self, texts, choices):
+        """Build a batched observation from decoded text and shared items."""
+        return {
+            "text": texts,
+            "choices": choices,
+            "items": self._buffers["items"].copy(),
+            "attributes": self._buffers["attributes"].copy(),
+            "action_mask": self._action_masks[
+                np.minimum(self._buffers["num_choices"], self._max_choices)
+            ],
+        }
+
+    def close_extras(self, **kwargs):
+        """Stop the workers and free the shared-memory blocks."""
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+
+        self._buffers = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+
+
+def check(num_envs: int = 4, steps: int = 30, seed: int = 0) -> int:
+    """Step this env and ShrineVectorEnv side by side, with reset options.
+
+    Both start from a start-state bank and are reset with and without
+    `{"start_states": False}`; raises AssertionError at the first
+    observation, reward, end flag or info that differs. Returns the steps
+    compared.
+    """
+    from start_states import StartStateBank
+    from vector_env import ShrineVectorEnv
+
+    env_fn = functools.partial(
+        ReinforcedShrineAdventureEnv, start_states=StartStateBank.load()
+    )
+    sync_envs = ShrineVectorEnv(num_envs, env_fn)
+    async_envs = ShrineAsyncVectorEnv(num_envs, num_workers=2, env_fn=env_fn)
+    rng = np.random.default_rng(seed)
+    compared = 0
+
+    def compare(expected, actual, where):
+        for key in ("text", "choices", "items", "attributes", "action_mask"):
+            assert np.array_equal(
+                np.asarray(expected[key], dtype=object),
+                np.asarray(actual[key], dtype=object),
+            ), f"{key} differs {where}"
+
+    def compare_infos(expected, actual, where):
+        assert expected.keys() == actual.keys(), f"info keys differ {where}"
+        for key, value in expected.items():
+            if key == "final_obs":
+                for i in np.flatnonzero(expected["_final_obs"]):
+                    compare(value[i], actual[key][i], f"in final_obs {where}")
+            elif isinstance(value, dict):
+                compare_infos(value, actual[key], where)
+            else:
+                assert np.array_equal(value, actual[key]), f"{key} differs {where}"
+
+    try:
+        for options in ({"start_states": False}, None, {"start_states": True}):
+            where = f"after reset with options={options}"
+            expected, expected_infos = sync_envs.reset(seed=seed, options=options)
+            actual, actual_infos = async_envs.reset(seed=seed, options=options)
+            compare(expected, actual, where)
+            compare_infos(expected_infos, actual_infos, where)
+            for step in range(steps):
+                where = f"at step {step} after reset with options={options}"
+                actions = rng.integers(np.maximum(async_envs.num_choices, 1))
+                expected, *sync_rest, expected_infos = sync_envs.step(actions)
+                actual, *async_rest, actual_infos = async_envs.step(actions)
+                compare(expected, actual, where)
+                compare_infos(expected_infos, actual_infos, where)
+                for a, b in zip(sync_rest, async_rest):
+                    assert np.array_equal(a, b), f"rewards or end flags differ {where}"
+                compared += 1
+    finally:
+        sync_envs.close()
+        async_envs.close()
+    return compared
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check ShrineAsyncVectorEnv against ShrineVectorEnv."
+    )
+    parser.add_argument("--envs", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    steps = check(args.envs, args.steps, args.seed)
+    print(f"ShrineAsyncVectorEnv matches ShrineVectorEnv over {steps} steps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Throughput suite for the shrine env and its faster modes.
+
+For each env mode, measures:
+- `reset` latency
+- `step` latency under a uniform random policy over the valid choices
+- `calculate_reward` latency, at every state the episodes pass through
+- full episodes (reset plus steps until the episode ends)
+
+and reports steps/sec, p50/p99 latencies and the peak RSS of the process.
+Each mode runs in its own fresh process, so peak RSS belongs to that mode
+alone. Modes whose dependencies are missing (transformers for `tokenize`,
+pygame for `frames`, the compiled graph for `tabular`) are reported as
+skipped, and so is a mode whose process dies.
+
+Results are written as JSON along with the machine, commit and settings they
+came from. `--compare` prints each number's change against an earlier
+results file; only compare runs from the same machine.
+
+Run from the repository root:
+    python playground/bench/env_suite.py --output bench_env.json
+    python playground/bench/env_suite.py --compare bench_env.json
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+PLAYGROUND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLAYGROUND)
+
+# Constructor arguments of ReinforcedShrineAdventureEnv for each mode
+MODES = {
+    "stock": {},
+    "compiled": {"runtime": "compiled"},
+    "intern": {"intern": True},
+    "compiled_intern": {"runtime": "compiled", "intern": True},
+    "history": {"history_size": 4},
+    "tokenize": {"tokenize": True},
+    "frames": {"frame_size": (160, 90)},
+    "tabular": None,
+}
+
+# Latency metrics, in microseconds
+LATENCIES = ("reset_us", "step_us", "reward_us", "episode_us")
+
+
+def make_env(mode: str):
+    if MODES[mode] is None:
+        from tabular_env import TabularShrineEnv
+
+        return TabularShrineEnv()
+    from env import ReinforcedShrineAdventureEnv
+
+    return ReinforcedShrineAdventureEnv(**MODES[mode])
+
+
+def summary(latencies) -> dict:
+    latencies = np.asarray(latencies) * 1e6
+    return {
+        "mean": float(latencies.mean()),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def random_action(observation, rng) -> int:
+    """Uniformly random valid choice, read from the action mask."""
+    return int(rng.integers(int(observation["action_mask"].sum())))
+
+
+def measure(mode: str, episodes: int, resets: int, seed: int) -> dict:
+    """All measurements for one mode; runs in its own process."""
+    try:
+        env = make_env(mode)
+    except (ImportError, FileNotFoundError) as error:
+        return {"skipped": f"{type(error).__name__}: {error}"}
+    rng = np.random.default_rng(seed)
+    reward = getattr(env, "calculate_reward", None)
+    clock = time.perf_counter
+
+    # Warm up caches (token, frame, parsed saves) so every mode is measured hot
+    env.reset(seed=seed)
+    for _ in range(min(episodes, 50)):
+        observation, _ = env.reset()
+        done = False
+        while not done:
+            observation, _, terminated, truncated, _ = env.step(
+                random_action(observation, rng)
+            )
+            done = terminated or truncated
+
+    reset_times = np.empty(resets)
+    for i in range(resets):
+        start = clock()
+        env.reset()
+        reset_times[i] = clock() - start
+
+    step_times, reward_times, episode_times = [], [], []
+    steps = 0
+    for _ in range(episodes):
+        episode_start = clock()
+        observation, _ = env.reset()
+        done = False
+        while not done:
+            action = random_action(observation, rng)
+            start = clock()
+            observation, _, terminated, truncated, _ = env.step(action)
+            step_times.append(clock() - start)
+            done = terminated or truncated
+            steps += 1
+            if reward is not None:
+                # Timed outside the episode clock; step() already paid for it
+                start = clock()
+                reward()
+                reward_times.append(clock() - start)
+                episode_start += clock() - start
+        episode_times.append(clock() - episode_start)
+    env.close()
+
+    elapsed = sum(episode_times)
+    return {
+        "steps_per_sec": steps / elapsed,
+        "episodes_per_sec": episodes / elapsed,
+        "steps": steps,
+        "reset_us": summary(reset_times),
+        "step_us": summary(step_times),
+        "reward_us": summary(reward_times) if reward_times else None,
+        "episode_us": summary(episode_times),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_mode(connection, *args):
+    """Process target: send the measurements of one mode back to the parent."""
+    connection.send(measure(*args))
+    connection.close()
+
+
+def machine() -> dict:
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=PLAYGROUND,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(mode: str, result: dict):
+    if "skipped" in result:
+        print(f"{mode:<16} skipped ({result['skipped']})")
+        return
+
+    def latency(name):
+        numbers = result[name]
+        if numbers is None:
+            return f"{'n/a':>15}"
+        return f"{numbers['p50']:7.1f}/{numbers['p99']:7.1f}"
+
+    print(
+        f"{mode:<16} {result['steps_per_sec']:9,.0f} steps/s | "
+        f"reset {latency('reset_us')} | step {latency('step_us')} | "
+        f"reward {latency('reward_us')} | episode {latency('episode_us')} us "
+        f"p50/p99 | peak RSS {result['peak_rss_mb']:6.1f} MB"
+    )
+
+
+def compare(results: dict, baseline: dict):
+    """Print each number's change against a baseline results file."""
+    if baseline.get("machine") != results["machine"]:
+        print("warning: the baseline was recorded on a different machine")
+    print(f"Change against {baseline.get('commit')} ({baseline.get('time')}):")
+    for mode, result in results["modes"].items():
+        before = baseline.get("modes", {}).get(mode)
+        if not before or "skipped" in result or "skipped" in before:
+            continue
+        changes = []
+        for name in ("steps_per_sec", "peak_rss_mb", *LATENCIES):
+            now, was = result.get(name), before.get(name)
+            if now is None or was is None:
+                continue
+            if isinstance(now, dict):
+                now, was, name = now["p50"], was["p50"], f"{name} p50"
+            if was:
+                changes.append(f"{name} {(now - was) / was:+.1%}")
+        print(f"{mode:<16} " + " | ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shrine env modes.")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--episodes", type=int, default=500)
+    parser.add_argument("--resets", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to compare with")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes {sorted(unknown)}; choose from {list(MODES)}")
+
+    results = {
+        "machine": machine(),
+        "commit": commit(),
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "episodes": args.episodes,
+            "resets": args.resets,
+            "seed": args.seed,
+        },
+        "modes": {},
+    }
+    context = mp.get_context("spawn")
+    for mode in modes:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=run_mode,
+            args=(sender, mode, args.episodes, args.resets, args.seed),
+        )
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = None
+        process.join()
+        if result is None:
+            result = {"skipped": f"crashed with exit code {process.exitcode}"}
+        results["modes"][mode] = result
+        report(mode, result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold-miss benchmark for dialogue phrase matching.
+
+Scores every string of the compiled story graph (passages and choices) with
+an empty cache, so each call pays for a full scan, and compares that miss
+with a bare loop of `in` tests to show the matcher's own overhead.
+
+Run from the repository root:
+    python playground/bench/phrases.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rewards import get_reward_spec  # noqa: E402
+from story_graph import StoryGraph  # noqa: E402
+
+
+def in_loop(phrases, weights, text):
+    """One `in` test per phrase, with no matcher or memo around it."""
+    text = text.lower()
+    return sum(weight for phrase, weight in zip(phrases, weights) if phrase in text)
+
+
+def time_per_string(fn, texts, repeats):
+    """Mean and p50 microseconds per string over several passes."""
+    latencies = np.empty((repeats, len(texts)), dtype=np.float64)
+    for r in range(repeats):
+        for i, text in enumerate(texts):
+            start = time.perf_counter()
+            fn(text)
+            latencies[r, i] = time.perf_counter() - start
+    latencies *= 1e6
+    return latencies.mean(), np.percentile(latencies, 50)
+
+
+def main(repeats=50):
+    try:
+        texts = StoryGraph().strings
+    except FileNotFoundError:
+        sys.exit("Compile the story graph first: python playground/story_graph.py")
+    matcher = get_reward_spec().dialogue
+    phrases, weights = matcher.phrases, matcher.weights
+
+    def cold_score(text):
+        # Empty the memo so every call scans the text
+        matcher._cache.clear()
+        return matcher.score(text)
+
+    for text in texts:
+        assert cold_score(text) == in_loop(phrases, weights, text), text
+
+    print(
+        f"{len(texts)} strings, mean {np.mean([len(t) for t in texts]):.0f} chars, "
+        f"{len(phrases)} phrases"
+    )
+    for name, fn in (
+        ("in loop", lambda text: in_loop(phrases, weights, text)),
+        ("matcher", cold_score),
+    ):
+        mean, p50 = time_per_string(fn, texts, repeats)
+        print(f"{name:<8} mean {mean:7.1f} us | p50 {p50:7.1f} us per uncached string")
+
+
+if __name__ == "__main__":
+    main()
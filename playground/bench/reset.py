@@ -0,0 +1,71 @@
+"""
+Reset latency benchmark for the shrine environment.
+
+Compares the old reset path (read and parse story.ink.json, then continue to
+the first choice point) with the pooled reset that restores a saved runtime
+state.
+
+Run from the repository root:
+    python playground/bench/reset.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bink.story import story_from_file  # noqa: E402
+from env import ReinforcedShrineAdventureEnv  # noqa: E402
+from story_pool import STORY_PATH  # noqa: E402
+
+
+def parse_reset():
+    """Reset the way the environment used to: re-parse the whole story."""
+    story = story_from_file(STORY_PATH)
+    text = ""
+    while story.can_continue():
+        text += story.cont() + "\n"
+    return text, list(story.get_current_choices())
+
+
+def time_calls(fn, iterations):
+    """Time each call of fn and return the latencies in microseconds."""
+    latencies = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def report(name, latencies):
+    """Print a one-line latency summary."""
+    print(
+        f"{name:<14} mean {latencies.mean():9.1f} us | "
+        f"p50 {np.percentile(latencies, 50):9.1f} us | "
+        f"p99 {np.percentile(latencies, 99):9.1f} us"
+    )
+
+
+def main(iterations=500):
+    env = ReinforcedShrineAdventureEnv()
+
+    # Warm up both paths
+    parse_reset()
+    env.reset()
+
+    parsed = time_calls(parse_reset, iterations)
+    pooled = time_calls(env.reset, iterations)
+
+    print(f"Reset latency over {iterations} resets:")
+    report("parse + cont", parsed)
+    report("pooled", pooled)
+    print(f"Speedup: {parsed.mean() / pooled.mean():.1f}x")
+
+    env.close()
+
+
+if __name__ == "__main__":
+    main()
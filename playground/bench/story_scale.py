@@ -0,0 +1,198 @@
+"""
+Scaling benchmark on synthetic stories of growing size.
+
+Generates stories with `synthetic_story.py` and measures, for each size:
+- story parse time and memory per env (every env holds its own parsed story)
+- reset and step latency
+- token cache hit rate (when transformers is installed)
+- `SceneDynamics.render_history` time for a playthrough's history (when
+  pygame is installed; runs headless with the SDL dummy drivers)
+
+Each size runs in a fresh process so memory numbers don't leak between sizes.
+
+Run from the repository root:
+    python playground/bench/story_scale.py --knots 1000,10000,100000
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+PLAYGROUND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLAYGROUND)
+
+from synthetic_story import generate_story  # noqa: E402
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    with open("/proc/self/statm") as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def percentiles(latencies):
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def run_episodes(env, rng, steps):
+    """Step random valid choices, resetting as episodes end; latencies in us."""
+    latencies = np.empty(steps)
+    observation, _ = env.reset()
+    for i in range(steps):
+        action = int(rng.integers(len(observation["choices"])))
+        start = time.perf_counter()
+        observation, _, terminated, truncated, _ = env.step(action)
+        latencies[i] = time.perf_counter() - start
+        if terminated or truncated:
+            observation, _ = env.reset()
+    return latencies * 1e6
+
+
+def token_hit_rate(path, branching, rng, steps):
+    try:
+        from env import ReinforcedShrineAdventureEnv
+
+        env = ReinforcedShrineAdventureEnv(
+            tokenize=True, max_choices=branching, story_path=path
+        )
+    except ImportError:
+        return None
+    cache = env.token_cache
+    cache.hits = cache.misses = 0
+    run_episodes(env, rng, steps)
+    env.close()
+    return cache.hits / max(cache.hits + cache.misses, 1)
+
+
+def history_render_ms(path, max_lines):
+    """Time rendering the history of one long playthrough of the story."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    try:
+        import pygame
+    except ImportError:
+        return None, 0
+
+    # The game package and its assets are addressed from the repository root
+    sys.path.insert(0, os.path.dirname(PLAYGROUND))
+    from bink.story import story_from_file
+    from game.assets import Assets
+    from game.surface import SurfaceManager
+
+    pygame.init()
+    surface = pygame.display.set_mode((1920, 1080))
+    scene = SurfaceManager(surface, Assets()).scene
+
+    # Walk the first choice every time, logging lines like the game does
+    story = story_from_file(path)
+    while len(scene.history) < max_lines:
+        while story.can_continue():
+            scene.add_to_history(story.cont().strip())
+        choices = story.get_current_choices()
+        if not choices:
+            break
+        scene.add_to_history(choices[0], True)
+        story.choose_choice_index(0)
+
+    start = time.perf_counter()
+    scene.render_history(surface)
+    elapsed = (time.perf_counter() - start) * 1e3
+    pygame.quit()
+    return elapsed, len(scene.history)
+
+
+def measure(path, branching, steps, num_envs, history_lines):
+    """All measurements for one story; runs in its own process."""
+    from env import ReinforcedShrineAdventureEnv
+
+    rng = np.random.default_rng(0)
+    before = rss_mb()
+    start = time.perf_counter()
+    env = ReinforcedShrineAdventureEnv(max_choices=branching, story_path=path)
+    parse_s = time.perf_counter() - start
+
+    # The template keeps one parsed story; each env beyond it parses another
+    extra = [
+        ReinforcedShrineAdventureEnv(max_choices=branching, story_path=path)
+        for _ in range(num_envs)
+    ]
+    per_env_mb = (rss_mb() - before) / (num_envs + 1)
+
+    reset = np.empty(200)
+    for i in range(len(reset)):
+        start = time.perf_counter()
+        env.reset()
+        reset[i] = time.perf_counter() - start
+    step = run_episodes(env, rng, steps)
+    for other in extra:
+        other.close()
+    env.close()
+
+    render_ms, history = history_render_ms(path, history_lines)
+    return {
+        "parse_s": parse_s,
+        "mb_per_env": per_env_mb,
+        "reset_us": percentiles(reset * 1e6),
+        "step_us": percentiles(step),
+        "token_hit_rate": token_hit_rate(path, branching, rng, steps),
+        "history_render_ms": render_ms,
+        "history_lines": history,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark env cost vs story size.")
+    parser.add_argument("--knots", default="1000,10000,100000")
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--passage-words", type=int, default=40)
+    parser.add_argument("--variables", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--envs", type=int, default=1)
+    parser.add_argument("--history-lines", type=int, default=2000)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    context = mp.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for knots in (int(k) for k in args.knots.split(",")):
+            path = os.path.join(directory, f"story_{knots}.ink.json")
+            story = generate_story(
+                knots, args.branching, args.passage_words, args.variables
+            )
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(story, file, separators=(",", ":"))
+
+            with context.Pool(1) as pool:
+                result = pool.apply(
+                    measure,
+                    (path, args.branching, args.steps, args.envs, args.history_lines),
+                )
+            result["file_mb"] = os.path.getsize(path) / 2**20
+            results[knots] = result
+
+            tokens = result["token_hit_rate"]
+            render = result["history_render_ms"]
+            print(
+                f"{knots:>7} knots | {result['file_mb']:7.1f} MB json | "
+                f"parse {result['parse_s']:6.2f} s | "
+                f"{result['mb_per_env']:7.1f} MB/env | "
+                f"reset p50/p99 {result['reset_us'][0]:7.1f}/{result['reset_us'][1]:7.1f} us | "
+                f"step p50/p99 {result['step_us'][0]:7.1f}/{result['step_us'][1]:7.1f} us | "
+                f"token hits {'n/a' if tokens is None else f'{tokens:.1%}'} | "
+                f"history {'n/a' if render is None else f'{render:.1f} ms'}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Random-policy throughput of the Ink env against the table-driven envs.
+
+Needs the compiled story graph (`python playground/story_graph.py`).
+
+Run from the repository root:
+    python playground/bench/tabular_throughput.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from env import ReinforcedShrineAdventureEnv  # noqa: E402
+from story_graph import StoryGraph  # noqa: E402
+from tabular_env import TabularShrineEnv, VectorTabularShrineEnv  # noqa: E402
+
+
+def single_env_rate(env, num_episodes, rng):
+    """Run random episodes one at a time; return (steps/sec, episodes/min)."""
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(num_episodes):
+        observation, _ = env.reset()
+        done = truncated = False
+        while not done and not truncated:
+            action = int(rng.integers(len(observation["choices"])))
+            observation, _, done, truncated, _ = env.step(action)
+            steps += 1
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, num_episodes / elapsed * 60
+
+
+def vector_env_rate(env, num_steps, rng):
+    """Step a batched env with random actions; return (steps/sec, episodes/min)."""
+    observation, _ = env.reset()
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        actions = (rng.random(env.num_envs) * observation["num_choices"]).astype(
+            np.int32
+        )
+        observation, _, done, _, _ = env.step(actions)
+        episodes += int(done.sum())
+    elapsed = time.perf_counter() - start
+    return num_steps * env.num_envs / elapsed, episodes / elapsed * 60
+
+
+def main(batch_size=100_000):
+    rng = np.random.default_rng(0)
+    graph = StoryGraph()
+
+    results = [
+        ("ink", *single_env_rate(ReinforcedShrineAdventureEnv(), 100, rng)),
+        ("tabular", *single_env_rate(TabularShrineEnv(graph), 2000, rng)),
+        (
+            f"vector x{batch_size}",
+            *vector_env_rate(VectorTabularShrineEnv(batch_size, graph), 100, rng),
+        ),
+    ]
+
+    print(f"{'env':<16}{'steps/sec':>14}{'episodes/min':>16}")
+    for name, steps_rate, episode_rate in results:
+        print(f"{name:<16}{steps_rate:>14,.0f}{episode_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
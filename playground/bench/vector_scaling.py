@@ -0,0 +1,66 @@
+"""
+Steps/sec scaling curve for the multiprocess vector environment.
+
+Runs a uniform random policy on ShrineAsyncVectorEnv with 1 up to all cores
+worth of workers (a fixed number of envs per worker) and prints the
+throughput for each worker count, next to the in-process ShrineVectorEnv.
+
+Run from the repository root:
+    python playground/bench/vector_scaling.py
+"""
+
+import os
+import sys
+import time
+import multiprocessing as mp
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_vector_env import ShrineAsyncVectorEnv  # noqa: E402
+from vector_env import ShrineVectorEnv  # noqa: E402
+
+
+def random_actions(rng, num_choices):
+    """Pick a uniformly random valid choice for every env."""
+    return (rng.random(len(num_choices)) * num_choices).astype(np.int32)
+
+
+def steps_per_second(envs, num_steps, rng):
+    """Drive a vector env with random actions and return env steps per second."""
+    observations, _ = envs.reset(seed=0)
+    num_choices = np.array([len(c) for c in observations["choices"]])
+
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        observations, *_ = envs.step(random_actions(rng, num_choices))
+        num_choices = np.array([len(c) for c in observations["choices"]])
+    elapsed = time.perf_counter() - start
+
+    return num_steps * envs.num_envs / elapsed
+
+
+def main(envs_per_worker=4, num_steps=500):
+    rng = np.random.default_rng(0)
+    max_workers = mp.cpu_count()
+
+    print(f"{'mode':<8}{'workers':>8}{'envs':>6}{'steps/sec':>12}{'scaling':>9}")
+
+    sync_envs = ShrineVectorEnv(envs_per_worker)
+    sync_rate = steps_per_second(sync_envs, num_steps, rng)
+    sync_envs.close()
+    print(f"{'sync':<8}{1:>8}{envs_per_worker:>6}{sync_rate:>12.0f}{1.0:>8.2f}x")
+
+    for num_workers in range(1, max_workers + 1):
+        num_envs = num_workers * envs_per_worker
+        envs = ShrineAsyncVectorEnv(num_envs, num_workers)
+        rate = steps_per_second(envs, num_steps, rng)
+        envs.close()
+        print(
+            f"{'async':<8}{num_workers:>8}{num_envs:>6}{rate:>12.0f}"
+            f"{rate / sync_rate:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
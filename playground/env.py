@@ -2,12 +2,13 @@
 Custom Gymnasium environment for text-based adventure game using Ink story format.
 Implements a reinforcement learning environment with:
 - Text observations with choices
-- Item inventory system
-- Reward shaping based on key dialogue moments
+- Item inventory and attributes read straight from the story's Ink VARs
+- Reward shaping based on key dialogue moments (rules in rewards.toml, or
+  `# reward:` tags in the story)
 
 The environment follows the Gymnasium interface and includes:
-- Dict observation space with text, choices, and items
-- Discrete action space for selecting choices
+- Dict observation space with text, choices, items and an action mask
+- Discrete action space for selecting choices, `max_choices` wide
 - Reward calculation based on key dialogue moments
 - State tracking for items and story progress
 
@@ -16,43 +17,168 @@ Key features:
 - Path choice consequences
 - Reward shaping for exploration and preparation
 - Episode termination conditions
+- Story parsed once per process; resets restore a saved runtime state
+- Text holds only the passage produced by the last choice, with an optional
+  ring of the last K passages (`history_size`)
+- Optional pre-tokenized text (`tokenize=True`): DistilBERT input ids and
+  attention masks, cached per passage
+- Cheap snapshots (`get_state`/`set_state`/`clone`) for lookahead and
+  branching rollouts
+- Optional curriculum resets from a bank of mid-story states (`start_states`)
+- Passages and choices interned process-wide; with `intern=True` observations
+  carry their integer ids (`text_id`, `choice_ids`) instead of text
+- Optional rendered frames (`frame_size`): the game's scene drawn headless,
+  as uint8 arrays that views share with a reused offscreen surface
+- Choice of story runtime (`runtime`): bink, or the faster pure-Python
+  `CompiledStory` for the ink subset the story uses
+- Optional count-based exploration bonus (`novelty`) added to the reward,
+  from (state, action) visit counts that vector-env workers can share
 """
 
 import gymnasium as gym
 from gymnasium import spaces
-from bink.story import story_from_file
+from story_pool import STORY_PATH, get_template, state_key, state_knot
+from rewards import get_reward_spec
+from passages import PassageBuffer
+from strings import get_string_table
+from frames import FIRST_SCENE, FrameRenderer, knot_scenes, passage_scene
+from tokens import get_token_cache
+from novelty import state_digest
 import numpy as np
 
+# Ink VARs exposed to the agent, in observation order
+ITEM_NAMES = (
+    "has_talisman",
+    "has_flashlight",
+    "has_water",
+    "has_first_aid_kit",
+    "has_snacks",
+)
+ATTRIBUTE_NAMES = ("curiosity", "social", "caution", "supernatural")
+
+# Default width of the action space
+MAX_CHOICES = 4
+
+
+def action_masks(max_choices: int) -> np.ndarray:
+    """Read-only int8 masks where row n allows the first n actions."""
+    masks = np.tri(max_choices + 1, max_choices, -1, dtype=np.int8)
+    masks.flags.writeable = False
+    return masks
+
 
 class ReinforcedShrineAdventureEnv(gym.Env):
     """Custom Environment that follows gym interface"""
 
     metadata = {"render.modes": ["human"]}
 
-    def __init__(self):
+    def __init__(
+        self,
+        history_size: int = 0,
+        tokenize: bool = False,
+        max_choices: int = MAX_CHOICES,
+        story_path: str = STORY_PATH,
+        start_states=None,
+        intern: bool = False,
+        frame_size=None,
+        runtime: str = "bink",
+        novelty=None,
+    ):
         super().__init__()
-        self.story = story_from_file("story/json/story.ink.json")
-        self.action_space = spaces.Discrete(4)
-        self.observation_space = spaces.Dict(
-            {
-                "text": spaces.Text(max_length=2000),
-                "choices": spaces.Sequence(spaces.Text(max_length=100)),
-                "items": spaces.Box(
-                    low=np.array([0] * 5),
-                    high=np.array([1] * 5),
-                    dtype=np.float16,
-                ),
-            }
+        self.template = get_template(story_path, runtime)
+        if start_states is not None and start_states.runtime != runtime:
+            raise ValueError(
+                f"start-state bank was saved by the {start_states.runtime!r} "
+                f"runtime and can't load into {runtime!r}"
+            )
+        self.reward_spec = get_reward_spec()
+        self.story = self.template.acquire()
+        self.variables = self.template.variables(self.story)
+        self.history_size = history_size
+        self.tokenize = tokenize
+        self.max_choices = max_choices
+        self.start_states = start_states
+        self.intern = intern
+        self.novelty = novelty
+        self.strings = get_string_table()
+        self.frame_size = tuple(frame_size) if frame_size is not None else None
+        self.frames = None
+        if self.frame_size is not None:
+            # Imports pygame, so only envs that render pay for it
+            self.frames = FrameRenderer(self.frame_size)
+            self.frame_slot = 0
+            self._knot_scenes = knot_scenes(self.template.source)
+            self.scene = FIRST_SCENE
+        self._action_masks = action_masks(max_choices)
+        # Read-only (text_id, choice_ids) arrays per passage and choice ids
+        self._id_arrays = {}
+        self.passages = PassageBuffer(
+            history_size, tags=bool(self.template.reward_tags)
         )
-
-        # Only track essential items
-        self.items = {
-            "has_talisman": False,
-            "has_flashlight": False,
-            "has_water": False,
-            "has_first_aid_kit": False,
-            "has_snacks": False,
+        self.token_cache = get_token_cache() if tokenize else None
+        self.action_space = spaces.Discrete(max_choices)
+        observation_spaces = {
+            "text": spaces.Text(max_length=2000),
+            "choices": spaces.Sequence(spaces.Text(max_length=100)),
+            "items": spaces.Box(
+                low=np.array([0] * len(ITEM_NAMES)),
+                high=np.array([1] * len(ITEM_NAMES)),
+                dtype=np.float16,
+            ),
+            "attributes": spaces.Box(
+                low=-np.inf,
+                high=np.inf,
+                shape=(len(ATTRIBUTE_NAMES),),
+                dtype=np.float32,
+            ),
+            "action_mask": spaces.Box(
+                low=0, high=1, shape=(max_choices,), dtype=np.int8
+            ),
         }
+        if history_size > 0:
+            observation_spaces["history"] = spaces.Sequence(
+                spaces.Text(max_length=2000)
+            )
+        if intern:
+            # String table ids replace the raw passage and choices
+            del observation_spaces["text"], observation_spaces["choices"]
+            max_id = np.iinfo(np.int32).max
+            observation_spaces["text_id"] = spaces.Box(
+                low=0, high=max_id, shape=(), dtype=np.int32
+            )
+            observation_spaces["choice_ids"] = spaces.Box(
+                low=-1, high=max_id, shape=(max_choices,), dtype=np.int32
+            )
+        if self.frames is not None:
+            width, height = self.frame_size
+            observation_spaces["frame"] = spaces.Box(
+                low=0, high=255, shape=(height, width, 3), dtype=np.uint8
+            )
+        if self.token_cache is not None:
+            # Token arrays replace the raw passage
+            observation_spaces.pop("text", None)
+            length = self.token_cache.max_length
+            observation_spaces["input_ids"] = spaces.Box(
+                low=0,
+                high=self.token_cache.vocab_size - 1,
+                shape=(length,),
+                dtype=np.int32,
+            )
+            observation_spaces["attention_mask"] = spaces.Box(
+                low=0, high=1, shape=(length,), dtype=np.int8
+            )
+        self.observation_space = spaces.Dict(observation_spaces)
+
+        # Positions of the exposed VARs in the story's variable vector
+        index = self.variables.index
+        self._item_index = np.array([index[name] for name in ITEM_NAMES])
+        self._attribute_index = np.array([index[name] for name in ATTRIBUTE_NAMES])
+        self._prepared_index = np.array(
+            [index[name] for name in self.reward_spec.prepared_items]
+        )
+
+        # Builds each step's observation; FlatObservation swaps in a buffer writer
+        self.observe = self._get_observation
 
         self.episode_steps = 0
         self.max_steps = 20
@@ -60,117 +186,195 @@ class ReinforcedShrineAdventureEnv(gym.Env):
 
     def calculate_reward(self) -> float:
         """Calculate reward based on key dialogue moments"""
-        reward = 0.0
-
-        # Positive dialogue indicators (showing engagement/interest)
-        positive_dialogues = [
-            # Summer Break Choice
-            "sounds kinda sketchy",
-            "i still don't know",
-            "if they're super powerful",
-            "just thinking about what to pack",
-            "better to be prepared,",
-        ]
-
-        # Negative dialogue indicators (showing disengagement/avoidance)
-        negative_dialogues = [
-            # Summer Break Choice
-            "can't wait to see what's in there",
-            "i'm sorry, but i really can't",
-            "safety comes first",
-            "ignore the pang of regret",
-        ]
-
-        text_lower = self.current_text.lower()
-
-        # Check for positive dialogues
-        for dialogue in positive_dialogues:
-            if dialogue in text_lower:
-                reward += 5.0
-
-        # Check for negative dialogues
-        for dialogue in negative_dialogues:
-            if dialogue in text_lower:
-                reward -= 5.0
+        reward = self.dialogue_reward(self.current_text, self.passages.tags or ())
 
         # Add small positive reward for survival
         if not self.done:
-            reward += 0.1
+            reward += self.reward_spec.survival
 
         # Increase preparation rewards
         if self.done:
             if self.is_well_prepared():
-                reward += 15.0
+                reward += self.reward_spec.well_prepared
 
         return reward
 
+    def dialogue_reward(self, text: str, tags=()) -> float:
+        """Score a passage by the key dialogue moments and reward tags it contains"""
+        reward = self.reward_spec.dialogue.score(text)
+        if tags:
+            reward += self.template.reward_tags.score(tags)
+        return reward
+
     def is_well_prepared(self):
         """Check if player has essential items"""
-        return (
-            self.items["has_talisman"]
-            and self.items["has_flashlight"]
-            and self.items["has_water"]
-            and self.items["has_first_aid_kit"]
-        )
+        return bool(self.variables.vector[self._prepared_index].all())
 
-    def update_items(self, choice_text: str):
-        """Track only essential item acquisitions"""
-        if "Accept talisman" in choice_text:
-            self.items["has_talisman"] = True
-        elif "Pack a flashlight" in choice_text:
-            self.items["has_flashlight"] = True
-        elif "Pack water" in choice_text:
-            self.items["has_water"] = True
-        elif "Pack a first aid kit" in choice_text:
-            self.items["has_first_aid_kit"] = True
-        elif "Pack snacks" in choice_text:
-            self.items["has_snacks"] = True
+    @property
+    def items(self):
+        """Items currently held, read from the story's VARs"""
+        vector = self.variables.vector
+        return {name: bool(vector[i]) for name, i in zip(ITEM_NAMES, self._item_index)}
 
     def step(self, action):
         self.episode_steps += 1
         truncated = self.episode_steps >= self.max_steps
 
         if action >= len(self.current_choices):
-            return self._get_observation(), -1.0, True, truncated, {}
+            return self.observe(), -1.0, True, truncated, {}
 
-        # Take action and update state
-        choice_text = self.current_choices[action]
+        info = {}
+        if self.novelty is not None:
+            state = state_digest(self.story.save_state(), self.current_text)
+            info["intrinsic_reward"] = self.novelty.visit(state, action)
+
+        # Take action; VAR observers update the variable vector as the story runs
         self.story.choose_choice_index(action)
-        self.update_items(choice_text)
 
         # Get new text and choices
-        self.current_text = ""
-        while self.story.can_continue():
-            self.current_text += self.story.cont() + "\n"
-        self.current_choices = [choice for choice in self.story.get_current_choices()]
+        self.current_text = self.passages.read(self.story)
+        self._set_choices(self.story.get_current_choices())
+        if self.frames is not None:
+            self.scene = passage_scene(self.current_text, self.scene)
 
         self.done = len(self.current_choices) == 0 or truncated
-        reward = self.calculate_reward()
+        reward = self.calculate_reward() + info.get("intrinsic_reward", 0.0)
+
+        return self.observe(), reward, self.done, truncated, info
 
-        return self._get_observation(), reward, self.done, truncated, {}
+    def _set_choices(self, choices):
+        """Intern the offered choices, keeping their ids alongside the text."""
+        intern = self.strings.intern
+        self.choice_ids = [intern(choice) for choice in choices]
+        self.current_choices = self.strings.lookup(self.choice_ids)
 
     def _get_observation(self):
-        return {
+        observation = {
             "text": self.current_text,
             "choices": self.current_choices,
-            "items": np.array(
-                [float(v) for v in self.items.values()], dtype=np.float16
-            ),
+            "items": self.variables.vector[self._item_index].astype(np.float16),
+            "attributes": self.variables.vector[self._attribute_index],
+            "action_mask": self._action_masks[
+                min(len(self.current_choices), self.max_choices)
+            ],
         }
+        if self.passages.history is not None:
+            observation["history"] = tuple(self.passages.history)
+        if self.intern:
+            del observation["text"], observation["choices"]
+            key = (self.passages.text_id, *self.choice_ids)
+            arrays = self._id_arrays.get(key)
+            if arrays is None:
+                arrays = self._id_arrays[key] = self._build_id_arrays()
+            observation["text_id"], observation["choice_ids"] = arrays
+        if self.frames is not None:
+            observation["frame"] = self.frames.render(
+                self.frame_slot, self.current_text, self.current_choices, self.scene
+            )
+        if self.token_cache is not None:
+            observation.pop("text", None)
+            input_ids, attention_mask = self.token_cache.encode(self.current_text)
+            observation["input_ids"] = input_ids
+            observation["attention_mask"] = attention_mask
+        return observation
+
+    def _build_id_arrays(self):
+        text_id = np.array(self.passages.text_id, dtype=np.int32)
+        choice_ids = np.full(self.max_choices, -1, dtype=np.int32)
+        ids = self.choice_ids[: self.max_choices]
+        choice_ids[: len(ids)] = ids
+        text_id.flags.writeable = choice_ids.flags.writeable = False
+        return text_id, choice_ids
 
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed, options=options)
-        self.story = story_from_file("story/json/story.ink.json")
+        # Rewind to the snapshot taken at the first choice point instead of re-parsing
+        self.template.restore(self.story)
         self.done = False
-        self.current_text = ""
-        self.items = {key: False for key in self.items}
+        self.passages.clear()
+        self.passages.push(self.template.initial_text)
+        self.current_text = self.passages.text
         self.episode_steps = 0
+        self._set_choices(self.template.initial_choices)
+        if self.frames is not None:
+            self.scene = passage_scene(self.current_text, FIRST_SCENE)
+
+        # Curriculum start: resume from a banked mid-story state instead
+        options = options or {}
+        if self.start_states is not None and options.get("start_states", True):
+            if self.start_states.states:
+                knot, snapshot = self.start_states.sample(self.np_random)
+                self.set_state(snapshot)
+                self.episode_steps = 0
+                return self.observe(), {"start_knot": knot}
+
+        return self.observe(), {}
+
+    def get_state(self):
+        """Snapshot the episode so it can be restored with `set_state`."""
+        history = self.passages.history
+        return (
+            self.story.save_state(),
+            self.variables.vector.copy(),
+            self.episode_steps,
+            self.done,
+            self.current_text,
+            list(self.current_choices),
+            tuple(history) if history is not None else None,
+        )
 
-        while self.story.can_continue():
-            self.current_text += self.story.cont() + "\n"
-        self.current_choices = [choice for choice in self.story.get_current_choices()]
-
-        return self._get_observation(), {}
+    def set_state(self, state):
+        """Restore a snapshot taken with `get_state`, on this env or a clone."""
+        saved_state, variables, episode_steps, done, text, choices, history = state
+        self.story.load_state(saved_state)
+        self.variables.vector[:] = variables
+        self.episode_steps = episode_steps
+        self.done = done
+        self._set_choices(choices)
+        self.passages.clear()
+        if history is not None:
+            for passage in history:
+                self.passages.push(passage)
+        self.passages.set_text(text)
+        self.current_text = self.passages.text
+        if self.frames is not None:
+            knot = state_knot(saved_state)
+            self.scene = self._knot_scenes.get(knot) or passage_scene(text, self.scene)
+
+    def use_frames(self, frames: FrameRenderer, slot: int):
+        """Render into a slot of a shared renderer, e.g. one per vector env."""
+        self.frames = frames
+        self.frame_slot = slot
+
+    def state_hash(self) -> int:
+        """Hash identifying the current state for transposition tables."""
+        key = state_key(self.story.save_state(), self.current_text)
+        return hash((key, self.episode_steps))
+
+    def clone(self):
+        """New env at the same point of the episode, using a pooled story."""
+        env = type(self)(
+            history_size=self.history_size,
+            tokenize=self.tokenize,
+            max_choices=self.max_choices,
+            story_path=self.template.path,
+            start_states=self.start_states,
+            intern=self.intern,
+            frame_size=self.frame_size,
+            runtime=self.template.runtime,
+            novelty=self.novelty,
+        )
+        env.set_state(self.get_state())
+        if self.frames is not None:
+            # Ended states have no pending knot to take the scene from
+            env.scene = self.scene
+        return env
+
+    def close(self):
+        """Hand the parsed story back to the pool for reuse."""
+        if self.story is not None:
+            self.template.release(self.story)
+            self.story = None
 
     def render(self, mode="human"):
         print("\nCurrent text:")
@@ -0,0 +1,142 @@
+"""
+Running episode statistics kept in fixed-size ring buffers.
+
+Training reads the recent success rate and score average every episode.
+Rescanning a growing history for them costs O(n) per episode, O(n^2) over a
+run; these windows update in O(1) as each episode ends.
+
+The module includes:
+- RollingWindow: Ring buffer of the last N values with running sum, min and max
+- EpisodeStats: Env wrapper tracking returns, lengths and successes per episode
+
+Key features:
+- Memory fixed by the window size, however long the run
+- Sum kept incrementally and re-summed once per pass over the buffer, so
+  float error cannot build up
+- Min and max from monotonic index queues, amortized O(1) per value
+- All-time counts, success total and best/worst return alongside the windows
+"""
+
+from collections import deque
+import gymnasium as gym
+import numpy as np
+
+
+class RollingWindow:
+    """The last `size` values pushed, with O(1) mean, min and max."""
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError(f"window size must be at least 1, got {size}")
+        self.size = size
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        # Push numbers of candidate extremes, values monotonic front to back
+        self._minima = deque()
+        self._maxima = deque()
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def push(self, value: float):
+        value = float(value)
+        slot = self.count % self.size
+        if self.count >= self.size:
+            self.total -= self.values[slot]
+        self.values[slot] = value
+        self.total += value
+        self.count += 1
+        if slot == self.size - 1:
+            self.total = float(self.values.sum())
+
+        # Drop extremes that left the window or that the new value outranks
+        first = self.count - self.size
+        for queue, outranks in (
+            (self._minima, value.__le__),
+            (self._maxima, value.__ge__),
+        ):
+            while queue and queue[0] < first:
+                queue.popleft()
+            while queue and outranks(self.values[queue[-1] % self.size]):
+                queue.pop()
+            queue.append(self.count - 1)
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self) if self.count else 0.0
+
+    @property
+    def min(self) -> float:
+        return float(self.values[self._minima[0] % self.size]) if self.count else 0.0
+
+    @property
+    def max(self) -> float:
+        return float(self.values[self._maxima[0] % self.size]) if self.count else 0.0
+
+
+class EpisodeStats(gym.Wrapper):
+    """Tracks each episode's return and length in rolling windows.
+
+    An episode counts as a success when its return exceeds
+    `success_threshold`. Finished episodes are also reported in
+    `info["episode"]` as {"return", "length", "success"}.
+    """
+
+    def __init__(self, env, window: int = 100, success_threshold: float = 20.0):
+        super().__init__(env)
+        self.success_threshold = success_threshold
+        self.returns = RollingWindow(window)
+        self.lengths = RollingWindow(window)
+        self.successes = RollingWindow(window)
+        self.episodes = 0
+        self.total_successes = 0
+        self.best_return = float("-inf")
+        self.worst_return = float("inf")
+        self._return = 0.0
+        self._length = 0
+
+    def reset(self, *, seed=None, options=None):
+        self._return = 0.0
+        self._length = 0
+        return self.env.reset(seed=seed, options=options)
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._return += reward
+        self._length += 1
+        if terminated or truncated:
+            info = dict(info, episode=self._finish())
+        return observation, reward, terminated, truncated, info
+
+    def _finish(self) -> dict:
+        episode_return = float(self._return)
+        success = episode_return > self.success_threshold
+        self.returns.push(episode_return)
+        self.lengths.push(float(self._length))
+        self.successes.push(float(success))
+        self.episodes += 1
+        self.total_successes += success
+        self.best_return = max(self.best_return, episode_return)
+        self.worst_return = min(self.worst_return, episode_return)
+        return {"return": episode_return, "length": self._length, "success": success}
+
+    @property
+    def mean_return(self) -> float:
+        return self.returns.mean
+
+    @property
+    def mean_length(self) -> float:
+        return self.lengths.mean
+
+    @property
+    def success_rate(self) -> float:
+        """Share of successful episodes in the window."""
+        return self.successes.mean
+
+    @property
+    def overall_success_rate(self) -> float:
+        return self.total_successes / self.episodes if self.episodes else 0.0
@@ -0,0 +1,90 @@
+"""
+Flat, preallocated observations for the shrine env.
+
+The dict observation is rebuilt every step: a new dict, a float16 copy of
+the items, a padded choice-id array, and the agent then copies it all again
+into tensors. The wrapper here writes each observation into one record
+allocated up front and returns the same float32 vector over it every step.
+
+The module includes:
+- record_dtype: Structured dtype of a flat observation
+- as_record: Named-field view of a flat observation vector
+- FlatObservation: Env wrapper writing observations into a reused record
+
+Record fields, all float32 so the record is one contiguous float32 run:
+- text_id: passage id in the process-wide string table
+- items: (5,) item flags
+- attributes: (4,) attribute values
+- num_choices: number of choices offered
+- action_mask: (max_choices,) 1.0 for every valid action
+
+Key features:
+- The env skips building its dict observation; the wrapper reads the
+  story state straight into the record
+- Observations are the float32 vector `flat`, matching `observation_space`;
+  `as_record` views it by field name without copying
+- `torch.from_numpy` of the vector or of a field shares memory with it
+- Observations are valid until the next step or reset; copy to keep.
+  Gymnasium's env checker rejects this reuse, so check the bare env
+- Ids are exact in float32 up to 2^24 strings, far beyond the story's
+"""
+
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+from env import ATTRIBUTE_NAMES, ITEM_NAMES
+
+
+def record_dtype(max_choices: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("text_id", np.float32),
+            ("items", np.float32, (len(ITEM_NAMES),)),
+            ("attributes", np.float32, (len(ATTRIBUTE_NAMES),)),
+            ("num_choices", np.float32),
+            ("action_mask", np.float32, (max_choices,)),
+        ]
+    )
+
+
+def as_record(flat: np.ndarray) -> np.ndarray:
+    """View a (size,) flat observation as its (1,) record; no copy."""
+    fixed = 2 + len(ITEM_NAMES) + len(ATTRIBUTE_NAMES)
+    return flat.view(record_dtype(flat.shape[-1] - fixed))
+
+
+class FlatObservation(gym.Wrapper):
+    """Returns every observation as the same float32 vector, `flat`."""
+
+    def __init__(self, env):
+        super().__init__(env)
+        base = self.base = env.unwrapped
+        self.record = np.zeros(1, dtype=record_dtype(base.max_choices))
+        self.flat = self.record.view(np.float32)
+        self.observation_space = spaces.Box(
+            low=-np.inf, high=np.inf, shape=self.flat.shape, dtype=np.float32
+        )
+
+        # Items and attributes are adjacent in the record, so one take fills
+        # both; num_choices and the mask come from one precomputed row
+        self._index = np.concatenate([base._item_index, base._attribute_index])
+        self._state = self.flat[1 : 1 + len(self._index)]
+        self._tail = self.flat[1 + len(self._index) :]
+        tails = np.zeros((base.max_choices + 1, 1 + base.max_choices), np.float32)
+        tails[:, 0] = np.arange(base.max_choices + 1)
+        tails[:, 1:] = base._action_masks
+        self._tails = tails
+        base.observe = self._write
+        self._write()
+
+    def _write(self):
+        base = self.base
+        self.flat[0] = base.passages.text_id
+        # mode="clip" writes straight into `out` instead of through a buffer
+        np.take(base.variables.vector, self._index, out=self._state, mode="clip")
+        self._tail[:] = self._tails[min(len(base.current_choices), base.max_choices)]
+        return self.flat
+
+    def close(self):
+        self.base.observe = self.base._get_observation
+        super().close()
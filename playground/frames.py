@@ -0,0 +1,217 @@
+"""
+Headless rendering of story states with the game's own scene components.
+
+The pygame scene stack already knows how to draw every story state: the
+scene background, a `DialogueBanner` with the last line, the speaker's
+sprite and one `ChoiceBanner` per choice. This module draws those offscreen
+for envs that observe rendered frames instead of (or alongside) text.
+
+The module includes:
+- knot_scenes: Game scene of every knot in a compiled story
+- passage_scene: Scene a passage ends in, following its `$jump` lines
+- ScenePainter: Draws states at game resolution and keeps the scaled-down frames
+- get_scene_painter: Process-wide painter keyed by frame and scene size
+- FrameRenderer: Reused output surface with one frame slot per env
+
+Key features:
+- Runs headless with the SDL dummy video and audio drivers
+- States are laid out at `scene_size` and scaled down to `frame_size`
+- Each distinct state is drawn once; repeats copy the cached frame, kept as
+  packed 32-bit pixel rows so the copy is a plain memcpy
+- Frames are `pygame.surfarray.pixels3d` views of one output surface that
+  holds every slot, so a batch of frames is a single array, never stacked
+- Frames are valid until the next render into the same slot; copy to keep
+"""
+
+import os
+import sys
+import json
+from collections import OrderedDict
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRAME_SIZE = (160, 90)
+SCENE_SIZE = (1920, 1080)
+FIRST_SCENE = "summer_break_choice"
+
+# Background drawn by each game surface
+SCENE_BACKGROUNDS = {
+    "summer_break_choice": "empty_classroom",
+    "packing": "bedroom",
+    "walk_to_gate": "abandoned_amusement_park",
+    "beach_path": "beach",
+    "mountain_path": "maintenance_station",
+    "station_night": "maintenance_station_interior",
+    "watch_storm": "broken_bridge",
+    "silent_morning": "morning_forest",
+    "shrine": "shrine",
+}
+
+
+def knot_scenes(source: str) -> dict:
+    """Game scene of every knot, e.g. `4_1_beach_path` -> `beach_path`.
+
+    Helper knots take the scene of the numbered knot whose file they follow.
+    """
+    scenes = {}
+    scene = FIRST_SCENE
+    for knot in json.loads(source)["root"][-1]:
+        if knot[:1].isdigit():
+            scene = knot.lstrip("0123456789_")
+        scenes[knot] = scene
+    return scenes
+
+
+def passage_scene(text: str, scene: str) -> str:
+    """Scene a passage ends in: its last `$jump` target, if it has one."""
+    start = text.rfind("$jump")
+    if start < 0:
+        return scene
+    return text[start + len("$jump") :].split("\n", 1)[0].strip()
+
+
+def dialogue_line(text: str) -> str:
+    """Line the game shows in the dialogue banner when the choices appear."""
+    for line in reversed(text.splitlines()):
+        line = line.strip()
+        if line and not line.startswith("$jump"):
+            return line
+    return ""
+
+
+class ScenePainter:
+    """Draws story states with SceneDynamics and caches the scaled frames."""
+
+    def __init__(
+        self,
+        frame_size=FRAME_SIZE,
+        scene_size=SCENE_SIZE,
+        max_cache_size: int = 4096,
+    ):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        import pygame
+
+        # The game package and its assets are addressed from the repository root
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        from game.assets import Assets
+        from game.surface import SurfaceManager
+
+        pygame.init()
+        self.pygame = pygame
+        self.frame_size = tuple(frame_size)
+        self.scene_size = tuple(scene_size)
+        self.canvas = pygame.Surface(self.scene_size, 0, 32)
+        self.small = pygame.Surface(self.frame_size, 0, 32)
+        self.scene = SurfaceManager(self.canvas, Assets()).scene
+        self._backgrounds = {}
+        self._sprites = {}
+        self._cache = OrderedDict()
+        self.max_cache_size = max_cache_size
+
+    def frame(self, text: str, choices, scene: str) -> np.ndarray:
+        """Packed uint32 (H, W) pixels of a state, drawn on first use."""
+        key = (scene, text, tuple(choices))
+        frame = self._cache.get(key)
+        if frame is not None:
+            self._cache.move_to_end(key)
+            return frame
+
+        frame = self._cache[key] = self._draw(text, choices, scene)
+        if len(self._cache) > self.max_cache_size:
+            self._cache.popitem(last=False)
+        return frame
+
+    def _draw(self, text: str, choices, scene: str) -> np.ndarray:
+        # Same order as the scene surfaces' draw()
+        canvas, dynamics = self.canvas, self.scene
+        canvas.blit(self._background(scene), (0, 0))
+
+        name, dialogue = dynamics.parse_dialogue(dialogue_line(text))
+        if dialogue:
+            dynamics.create_dialogue_banner(dialogue, name).draw(canvas)
+
+        sprite = self._sprite(name)
+        if sprite is not None:
+            width, height = self.scene_size
+            canvas.blit(sprite, (int(width * 0.05), int(height * 0.58)))
+
+        for i, choice in enumerate(choices):
+            dynamics.create_choice_banner(choice, i, 0.45 + (i * 0.08)).draw(canvas)
+
+        self.pygame.transform.smoothscale(canvas, self.frame_size, self.small)
+        pixels = self.pygame.surfarray.pixels2d(self.small)
+        frame = np.array(pixels.T)
+        # Release the pixel view so the surface unlocks for the next draw
+        del pixels
+        frame.flags.writeable = False
+        return frame
+
+    def _background(self, scene: str):
+        background = self._backgrounds.get(scene)
+        if background is None:
+            name = SCENE_BACKGROUNDS.get(scene, "moon_sky")
+            image = getattr(self.scene.assets.images.backgrounds, name)()
+            background = self._backgrounds[scene] = self.pygame.transform.scale(
+                image, self.scene_size
+            )
+        return background
+
+    def _sprite(self, name):
+        if name not in self._sprites:
+            self.scene.update_character_sprite(name)
+            self._sprites[name] = self.scene.character_sprite
+        return self._sprites[name]
+
+
+_painters = {}
+
+
+def get_scene_painter(frame_size=FRAME_SIZE, scene_size=SCENE_SIZE) -> ScenePainter:
+    """Return the process-wide painter for a frame and scene size."""
+    key = (tuple(frame_size), tuple(scene_size))
+    painter = _painters.get(key)
+    if painter is None:
+        painter = _painters[key] = ScenePainter(frame_size, scene_size)
+    return painter
+
+
+class FrameRenderer:
+    """Output surface with one frame slot per env, exposed as uint8 views.
+
+    Slots are bands of a single surface, so `frames` is an (N, H, W, 3) view
+    of all of them, obtained once from `pixels3d` and reused every step.
+    """
+
+    def __init__(
+        self, frame_size=FRAME_SIZE, num_frames: int = 1, scene_size=SCENE_SIZE
+    ):
+        self.painter = get_scene_painter(frame_size, scene_size)
+        pygame = self.painter.pygame
+        width, height = self.frame_size = tuple(frame_size)
+        self.scene_size = tuple(scene_size)
+        self.num_frames = num_frames
+        self.surface = pygame.Surface((width, height * num_frames), 0, 32)
+
+        # Rows of packed pixels, written with one contiguous copy per slot
+        self._rows = pygame.surfarray.pixels2d(self.surface).T
+
+        # pixels3d is indexed (x, y, channel); regroup rows into slots
+        self._pixels = pygame.surfarray.pixels3d(self.surface)
+        x_stride, y_stride, channel_stride = self._pixels.strides
+        self.frames = as_strided(
+            self._pixels,
+            shape=(num_frames, height, width, 3),
+            strides=(height * y_stride, y_stride, x_stride, channel_stride),
+            writeable=False,
+        )
+
+    def render(self, slot: int, text: str, choices, scene: str) -> np.ndarray:
+        """Draw a state into a slot and return the slot's (H, W, 3) view."""
+        height = self.frame_size[1]
+        start = slot * height
+        self._rows[start : start + height] = self.painter.frame(text, choices, scene)
+        return self.frames[slot]
@@ -0,0 +1,1108 @@
+"""
+Pure-Python runtime for the subset of compiled ink the story uses.
+
+bink runs the full ink language. The story only needs a small part of it:
+text, newlines, choices, conditional diverts and integer/boolean VARs. This
+runtime compiles that part of the compiled story JSON once per process into
+flat per-container instruction lists of closures, then steps them with the
+same output rules as the reference ink runtime. It skips the FFI round trip
+and the JSON state (de)serialization that bink does on every call.
+
+The module includes:
+- InkProgram: Container tree of a compiled story with every instruction
+  compiled to a closure
+- get_program: Process-wide program cache keyed by story source
+- CompiledStory: Runtime with the bink `Story` methods the playground uses
+- verify: Plays every branch in lockstep with bink and compares the two
+- benchmark: Times random playthroughs on both runtimes
+
+Key features:
+- Diverts and choice targets are resolved to containers at compile time
+- Same line breaking as ink: output runs past each newline to look for more
+  text, then rewinds, using an undo journal instead of state copies
+- Same visit counting as ink, so once-only choices behave identically
+- Saves keep bink's `variablesState` and `targetPath` layout, so
+  `state_key` and `state_knot` give the same result for both runtimes
+- Anything outside the supported subset (glue, functions, tunnels, threads,
+  lists, sequences, ...) is rejected when the story is compiled
+
+Saved states are not interchangeable between runtimes: loading a bink save
+into a `CompiledStory` raises ValueError, and the reverse fails inside bink.
+
+Run from the repository root:
+    python playground/ink_runtime.py --verify
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+STORY_PATH = "story/json/story.ink.json"
+
+# Choice point flags
+_HAS_CONDITION = 1
+_HAS_START_CONTENT = 2
+_HAS_CHOICE_ONLY_CONTENT = 4
+_INVISIBLE_DEFAULT = 8
+_ONCE_ONLY = 16
+
+# Container flags
+_COUNT_VISITS = 1
+_COUNT_START_ONLY = 4
+
+
+class _Marker:
+    """Control command left in the output stream, e.g. the start of a string."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+_BEGIN_STRING = _Marker("str")
+_BEGIN_TAG = _Marker("#")
+
+# Returned by instructions that stop the flow; diverts return their target
+_DONE = _Marker("done")
+_END = _Marker("end")
+
+
+class _Tag:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Variable:
+    """VAR printed inside a precompiled line."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _Container:
+    """Compiled container: instructions, named children and visit counting."""
+
+    __slots__ = (
+        "path",
+        "parent",
+        "index",
+        "content",
+        "named",
+        "slot",
+        "start_only",
+        "ancestors",
+        "after",
+        "lines",
+    )
+
+    def __init__(self, path: str, parent, index: int):
+        self.path = path
+        self.parent = parent
+        # Position in the parent's content; -1 for named-only containers
+        self.index = index
+        self.content = []
+        self.named = {}
+        # Index into the visit counts, or -1 if visits aren't counted
+        self.slot = -1
+        self.start_only = False
+        self.ancestors = (self,) + (parent.ancestors if parent else ())
+        # Where the flow goes after the last instruction; None ends it
+        self.after = None
+        # Lines that cont() can print without stepping, by start index
+        self.lines = {}
+
+
+def clean_whitespace(text: str) -> str:
+    """ink's output cleanup: collapse inline whitespace, trim every line."""
+    if "  " not in text and "\t" not in text and " \n" not in text:
+        if not text.startswith(" ") and "\n " not in text:
+            return text if not text.endswith(" ") else text.rstrip(" ")
+    return "\n".join(" ".join(line.split()) for line in text.split("\n"))
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, _Container):
+        raise RuntimeError("divert targets have no truth value")
+    return bool(value)
+
+
+def _output_text(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _divide(x, y):
+    if isinstance(x, float) or isinstance(y, float):
+        return x / y
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+
+def _remainder(x, y):
+    if isinstance(x, float) or isinstance(y, float):
+        return x - y * int(x / y)
+    return x - y * _divide(x, y)
+
+
+_BINARY = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "/": _divide,
+    "%": _remainder,
+    "==": lambda x, y: x == y,
+    "!=": lambda x, y: x != y,
+    "<": lambda x, y: x < y,
+    ">": lambda x, y: x > y,
+    "<=": lambda x, y: x <= y,
+    ">=": lambda x, y: x >= y,
+    "&&": lambda x, y: _truthy(x) and _truthy(y),
+    "||": lambda x, y: _truthy(x) or _truthy(y),
+    "MIN": min,
+    "MAX": max,
+}
+
+_UNARY = {
+    "!": lambda x: not _truthy(x),
+    "_": lambda x: -x,
+}
+
+
+# Instructions: each takes the running CompiledStory
+
+
+def _binary_op(function):
+    def op(story):
+        stack = story.stack
+        y = stack.pop()
+        stack[-1] = function(stack[-1], y)
+
+    return op
+
+
+def _unary_op(function):
+    def op(story):
+        stack = story.stack
+        stack[-1] = function(stack[-1])
+
+    return op
+
+
+def _text_op(text: str):
+    def op(story):
+        if story.in_eval:
+            story.stack.append(text)
+        else:
+            story.output.append(text)
+
+    return op
+
+
+def _value_op(value):
+    def op(story):
+        if story.in_eval:
+            story.stack.append(value)
+
+    return op
+
+
+def _newline(story):
+    if story.in_eval:
+        story.stack.append("\n")
+        return
+    # Never lead with a newline and never repeat one
+    output = story.output
+    if not story.ends_in_newline() and any(type(item) is str for item in output):
+        output.append("\n")
+
+
+def _eval_start(story):
+    story.in_eval = True
+
+
+def _eval_end(story):
+    story.in_eval = False
+
+
+def _begin_string(story):
+    story.output.append(_BEGIN_STRING)
+    story.str_depth += 1
+    story.in_eval = False
+
+
+def _end_string(story):
+    output = story.output
+    start = len(output) - 1
+    while output[start] is not _BEGIN_STRING:
+        start -= 1
+    parts = [item for item in output[start + 1 :] if type(item) is str]
+    tags = [item for item in output[start + 1 :] if type(item) is _Tag]
+    del output[start:]
+    output.extend(tags)
+    story.str_depth -= 1
+    story.in_eval = True
+    story.stack.append("".join(parts))
+
+
+def _begin_tag(story):
+    story.output.append(_BEGIN_TAG)
+
+
+def _end_tag(story):
+    if story.str_depth:
+        raise RuntimeError("tags on choice text are not supported")
+    output = story.output
+    start = len(output) - 1
+    while output[start] is not _BEGIN_TAG:
+        start -= 1
+    text = "".join(item for item in output[start + 1 :] if type(item) is str)
+    del output[start:]
+    output.append(_Tag(clean_whitespace(text)))
+
+
+def _output_value(story):
+    story.output.append(_output_text(story.stack.pop()))
+
+
+def _done(story):
+    return _DONE
+
+
+def _end(story):
+    return _END
+
+
+def _nop(story):
+    pass
+
+
+_COMMANDS = {
+    "\n": _newline,
+    "ev": _eval_start,
+    "/ev": _eval_end,
+    "str": _begin_string,
+    "/str": _end_string,
+    "#": _begin_tag,
+    "/#": _end_tag,
+    "out": _output_value,
+    "done": _done,
+    "end": _end,
+    "nop": _nop,
+}
+
+
+def _divert_op(target, conditional: bool):
+    if conditional:
+
+        def op(story):
+            if story.stack.pop():
+                return target
+
+    else:
+
+        def op(story):
+            return target
+
+    return op
+
+
+def _choice_op(target: _Container, flags: int):
+    condition = flags & _HAS_CONDITION
+    start_content = flags & _HAS_START_CONTENT
+    choice_only = flags & _HAS_CHOICE_ONLY_CONTENT
+    slot = target.slot if flags & _ONCE_ONLY else -1
+
+    def op(story):
+        stack = story.stack
+        show = _truthy(stack.pop()) if condition else True
+        text = stack.pop() if choice_only else ""
+        if start_content:
+            text = stack.pop() + text
+        if slot >= 0 and story.visits[slot]:
+            return
+        if show:
+            story.choices.append((text.strip(" \t"), target))
+
+    return op
+
+
+def _read_op(name: str):
+    def op(story):
+        story.stack.append(story.variables[name])
+
+    return op
+
+
+def _assign_op(name: str, redefine: bool):
+    def op(story):
+        variables = story.variables
+        if redefine and name not in variables:
+            raise RuntimeError(f"assigning undeclared VAR {name!r}")
+        story.journal.append((name, variables.get(name)))
+        variables[name] = story.stack.pop()
+
+    return op
+
+
+class InkProgram:
+    """Container tree of a compiled story, instructions compiled to closures.
+
+    Raises ValueError for anything outside the subset the runtime supports.
+    """
+
+    def __init__(self, source: str):
+        data = json.loads(source)
+        if data.get("listDefs"):
+            raise ValueError("ink lists are not supported")
+        self.containers = {}
+        self.counted = []
+        self.root = self._build(data["root"], None, "", -1)
+        for container in self.containers.values():
+            raw = container.content
+            container.lines = _plain_lines(raw)
+            container.content = [
+                item
+                if type(item) is _Container
+                else self._compile(item, container, index)
+                for index, item in enumerate(raw)
+            ]
+            for start, end in _eval_blocks(raw):
+                container.content[start] = _block_op(container.content[start:end])
+            if not container.content:
+                raise ValueError(f"empty container at {container.path!r}")
+        # Parents come before their children, so `after` is set top-down
+        for container in self.containers.values():
+            parent = container.parent
+            if container.index >= 0 and parent is not None:
+                if container.index + 1 < len(parent.content):
+                    container.after = (parent, container.index + 1)
+                else:
+                    container.after = parent.after
+
+        # VARs are declared by running the global declarations once
+        self.defaults = {}
+        self.visits = [0] * len(self.counted)
+        decl = self.root.named.get("global decl")
+        if decl is not None:
+            story = CompiledStory(self)
+            story.choose_path(decl, count_turn=False)
+            story.cont()
+            self.defaults = story.variables
+            self.visits = story.visits
+
+        # Parsed saves, so repeated loads of the same state skip json.loads
+        self._saves = {}
+
+    def _build(self, node, parent, path: str, index: int) -> _Container:
+        meta = _terminator(node, path)
+        container = _Container(path, parent, index)
+        self.containers[path] = container
+
+        flags = meta.get("#f", 0)
+        if flags & _COUNT_VISITS:
+            container.slot = len(self.counted)
+            self.counted.append(container)
+        container.start_only = bool(flags & _COUNT_START_ONLY)
+
+        for i, item in enumerate(node[:-1]):
+            if isinstance(item, list):
+                name = _terminator(item, _join(path, str(i))).get("#n")
+                child_path = _join(path, name if name else str(i))
+                item = self._build(item, container, child_path, i)
+                if name:
+                    container.named[name] = item
+            container.content.append(item)
+        for name, item in meta.items():
+            if name not in ("#f", "#n"):
+                container.named[name] = self._build(
+                    item, container, _join(path, name), -1
+                )
+        return container
+
+    def _compile(self, item, container: _Container, index: int):
+        where = f"{container.path}.{index}"
+        if isinstance(item, str):
+            if item.startswith("^"):
+                if "\n" in item:
+                    raise ValueError(f"text with line breaks at {where!r}")
+                return _text_op(item[1:])
+            if item in _COMMANDS:
+                return _COMMANDS[item]
+            if item in _BINARY:
+                return _binary_op(_BINARY[item])
+            if item in _UNARY:
+                return _unary_op(_UNARY[item])
+        elif isinstance(item, (bool, int, float)):
+            return _value_op(item)
+        elif isinstance(item, dict):
+            keys = set(item)
+            if "->" in item and keys <= {"->", "c"}:
+                target = self._pointer(container, item["->"], where)
+                return _divert_op(target, bool(item.get("c")))
+            if "*" in item and keys <= {"*", "flg"}:
+                flags = item.get("flg", 0)
+                if flags & _INVISIBLE_DEFAULT:
+                    raise ValueError(f"invisible default choice at {where!r}")
+                target, start = self._pointer(container, item["*"], where)
+                if start or (flags & _ONCE_ONLY and target.slot < 0):
+                    raise ValueError(
+                        f"choice target is not a counted container at {where!r}"
+                    )
+                return _choice_op(target, flags)
+            if "VAR?" in item and keys == {"VAR?"}:
+                return _read_op(item["VAR?"])
+            if "VAR=" in item and keys <= {"VAR=", "re"}:
+                return _assign_op(item["VAR="], bool(item.get("re")))
+        raise ValueError(f"unsupported ink instruction {item!r} at {where!r}")
+
+    def _pointer(self, container: _Container, target: str, where: str):
+        """(container, index) a path points at, resolved like ink's ResolvePath."""
+        components = target.split(".")
+        if components[0] == "":
+            # Relative to the instruction, so the first `^` is its container
+            if components[1] != "^":
+                raise ValueError(f"bad relative path {target!r} at {where!r}")
+            components = components[2:]
+        else:
+            container = self.root
+        for i, component in enumerate(components):
+            last = i == len(components) - 1
+            if component == "^":
+                container = container.parent
+            elif component.isdigit():
+                position = int(component)
+                if position >= len(container.content):
+                    break
+                if last:
+                    return container, position
+                container = container.content[position]
+            else:
+                container = container.named.get(component)
+            if container is None:
+                break
+        else:
+            return container, 0
+        raise ValueError(f"can't resolve {target!r} at {where!r}")
+
+
+def _plain_lines(content: list) -> dict:
+    """Lines made only of text and printed VARs, followed by more text.
+
+    Stepping one of these prints the line, looks ahead to the next text and
+    rewinds to just after the newline, leaving no other trace, so cont() can
+    print it straight away. Maps start index to (parts, index after newline);
+    parts is the finished line when it has no VARs.
+    """
+    lines = {}
+    for start in range(len(content)):
+        parts = []
+        i = start
+        while i < len(content):
+            item = content[i]
+            if isinstance(item, str) and item.startswith("^"):
+                parts.append(item[1:])
+                i += 1
+            elif item == "ev" and content[i + 2 : i + 4] == ["out", "/ev"]:
+                read = content[i + 1]
+                if not (isinstance(read, dict) and list(read) == ["VAR?"]):
+                    break
+                parts.append(_Variable(read["VAR?"]))
+                i += 4
+            else:
+                break
+        if not parts or content[i : i + 1] != ["\n"] or i + 1 >= len(content):
+            continue
+        following = content[i + 1]
+        if not (isinstance(following, str) and following.startswith("^")):
+            continue
+        if not following[1:].strip(" \t"):
+            continue
+        if all(type(part) is str for part in parts):
+            parts = clean_whitespace("".join(parts) + "\n")
+        lines[start] = (parts, i + 1)
+    return lines
+
+
+def _eval_blocks(content: list):
+    """(start, end) of each run of expressions and choice points from an `ev`.
+
+    Such a run leaves the output stream as it found it, so running it as one
+    instruction is indistinguishable from stepping through it.
+    """
+    for start, item in enumerate(content):
+        if item != "ev":
+            continue
+        mode = "content"
+        end = start
+        for i in range(start, len(content)):
+            item = content[i]
+            if mode == "content":
+                if item == "ev":
+                    mode = "eval"
+                elif not (isinstance(item, dict) and "*" in item) and item != "nop":
+                    break
+            elif mode == "eval":
+                if item == "str":
+                    mode = "string"
+                elif item == "/ev":
+                    mode = "content"
+                elif isinstance(item, str):
+                    if item not in _BINARY and item not in _UNARY:
+                        break
+                elif not (
+                    isinstance(item, (bool, int, float))
+                    or isinstance(item, dict)
+                    and ("VAR?" in item or "VAR=" in item)
+                ):
+                    break
+            elif item == "/str":
+                mode = "eval"
+            elif not (isinstance(item, str) and item.startswith("^")):
+                break
+            if mode != "string":
+                end = i + 1
+        if end - start > 1:
+            yield start, end
+
+
+def _block_op(ops: list):
+    length = len(ops)
+
+    def op(story):
+        for step in ops:
+            step(story)
+        return length
+
+    return op
+
+
+_NOWHERE = (None, 0)
+
+
+def _join(path: str, component: str) -> str:
+    return f"{path}.{component}" if path else component
+
+
+def _terminator(node, path: str) -> dict:
+    """Named content and flags from a container's last element (null or dict)."""
+    if not isinstance(node, list) or not node:
+        raise ValueError(f"expected a container at {path!r}")
+    meta = node[-1]
+    if meta is None:
+        return {}
+    if not isinstance(meta, dict):
+        raise ValueError(
+            f"container at {path!r} ends in {meta!r} instead of null or a dict"
+        )
+    return meta
+
+
+_programs = {}
+
+
+def get_program(source: str) -> InkProgram:
+    """Return the process-wide compiled program for a story source."""
+    program = _programs.get(source)
+    if program is None:
+        program = _programs[source] = InkProgram(source)
+    return program
+
+
+def _save_value(value):
+    return "^" + value if isinstance(value, str) else value
+
+
+def _load_value(value):
+    return value[1:] if isinstance(value, str) else value
+
+
+class CompiledStory:
+    """Runs a compiled ink story with the bink `Story` methods used here."""
+
+    def __init__(self, source):
+        self.program = source if isinstance(source, InkProgram) else get_program(source)
+        self.variables = dict(self.program.defaults)
+        self.visits = list(self.program.visits)
+        self.container = self.program.root
+        self.index = 0
+        self.previous = None
+        self.turn = -1
+        self.stack = []
+        self.output = []
+        self.choices = []
+        self.in_eval = False
+        self.str_depth = 0
+        self.safe_exit = False
+        # Undo entries: (VAR name, old value) or (visit slot, old count)
+        self.journal = []
+        self._observers = {}
+
+    # Stepping follows Step/NextContent of the reference runtime; cont()
+    # inlines both and keeps the pointer in locals
+
+    def _visit(self, container: _Container, at_start: bool):
+        if at_start or not container.start_only:
+            slot = container.slot
+            self.journal.append((slot, self.visits[slot]))
+            self.visits[slot] += 1
+
+    def _visit_entered(self, container: _Container, index: int, previous):
+        """Count the containers a divert or choice entered."""
+        opened = ()
+        if previous is not None:
+            before, position = previous
+            item = before.content[position] if position < len(before.content) else None
+            opened = (item if type(item) is _Container else before).ancestors
+
+        at_start = True
+        first = index == 0
+        while container is not None and (
+            container.start_only or container not in opened
+        ):
+            at_start = at_start and first
+            if container.slot >= 0:
+                self._visit(container, at_start)
+            first = container.index == 0
+            container = container.parent
+
+    def ends_in_newline(self) -> bool:
+        for item in reversed(self.output):
+            if type(item) is str:
+                if item == "\n":
+                    return True
+                if item.strip(" \t"):
+                    return False
+            elif type(item) is _Marker:
+                return False
+        return False
+
+    def _extended(self, mark: int) -> bool:
+        """Whether text or a tag followed the newline the snapshot was taken at."""
+        in_tag = False
+        for item in self.output[mark:]:
+            kind = type(item)
+            if kind is str:
+                if in_tag and item or item.strip(" \t"):
+                    return True
+            elif kind is _Tag:
+                if item.text:
+                    return True
+            elif item is _BEGIN_TAG:
+                in_tag = True
+        return False
+
+    def _restore(self, snapshot):
+        """Rewind to a snapshot taken in cont(); returns its pointer."""
+        (
+            container,
+            index,
+            previous,
+            mark,
+            stack,
+            choices,
+            self.in_eval,
+            self.safe_exit,
+            journal_mark,
+        ) = snapshot
+        del self.output[mark:]
+        self.stack = list(stack)
+        self.choices = list(choices)
+        journal = self.journal
+        variables, visits = self.variables, self.visits
+        while len(journal) > journal_mark:
+            key, value = journal.pop()
+            if type(key) is int:
+                visits[key] = value
+            elif value is None:
+                del variables[key]
+            else:
+                variables[key] = value
+        return container, index, previous
+
+    # bink Story API
+
+    def can_continue(self) -> bool:
+        return self.container is not None
+
+    def cont(self) -> str:
+        """Run to the end of the next line and return it."""
+        container = self.container
+        if container is None:
+            raise RuntimeError("can't continue: the story is waiting for a choice")
+        index = self.index
+        del self.journal[:]
+        self.safe_exit = False
+
+        line = container.lines.get(index)
+        if line is not None and not self.in_eval:
+            parts, index = line
+            if type(parts) is not str:
+                variables = self.variables
+                parts = clean_whitespace(
+                    "".join(
+                        part
+                        if type(part) is str
+                        else _output_text(variables[part.name])
+                        for part in parts
+                    )
+                    + "\n"
+                )
+            self.output = [parts]
+            self.index = index
+            self.previous = (container, index - 1)
+            return parts
+
+        previous = self.previous
+        content = container.content
+        output = self.output
+        del output[:]
+
+        # After each newline, keep going until more text shows up, then rewind
+        snapshot = None
+        checked = 0
+        while True:
+            item = content[index]
+            while type(item) is _Container:
+                if item.slot >= 0:
+                    self._visit(item, True)
+                container = item
+                content = item.content
+                index = 0
+                item = content[0]
+
+            jump = item(self)
+            if jump is None or type(jump) is int:
+                # Fused blocks return how many instructions they ran
+                index += jump or 1
+                previous = (container, index - 1)
+                if index >= len(content):
+                    container, index = container.after or _NOWHERE
+                    if container is not None:
+                        content = container.content
+            elif type(jump) is tuple:
+                previous = (container, index)
+                container, index = jump
+                content = container.content
+                self._visit_entered(container, index, previous)
+            else:
+                if jump is _END:
+                    previous = None
+                    self.choices = []
+                container = None
+                self.safe_exit = True
+
+            if self.str_depth:
+                if container is None:
+                    break
+                continue
+            if len(output) != checked:
+                checked = len(output)
+                if snapshot is not None:
+                    if checked > snapshot[3] and self._extended(snapshot[3]):
+                        container, index, previous = self._restore(snapshot)
+                        snapshot = None
+                        break
+                elif container is not None and self.ends_in_newline():
+                    snapshot = (
+                        container,
+                        index,
+                        previous,
+                        checked,
+                        tuple(self.stack),
+                        tuple(self.choices),
+                        self.in_eval,
+                        self.safe_exit,
+                        len(self.journal),
+                    )
+            if container is None:
+                if snapshot is not None and self.ends_in_newline():
+                    snapshot = None
+                break
+        if snapshot is not None:
+            container, index, previous = self._restore(snapshot)
+        self.container = container
+        self.index = index
+        self.previous = previous
+
+        if container is None and not self.choices and not self.safe_exit:
+            raise RuntimeError("ran out of content; the story needs a DONE or END")
+        if self._observers:
+            self._notify()
+        return self.current_text()
+
+    def _notify(self):
+        notified = set()
+        for key, _ in self.journal:
+            if type(key) is str and key not in notified:
+                notified.add(key)
+                value = self.variables[key]
+                for callback in self._observers.get(key, ()):
+                    callback(key, value)
+
+    def current_text(self) -> str:
+        return clean_whitespace(
+            "".join(item for item in self.output if type(item) is str)
+        )
+
+    def get_current_tags(self) -> list:
+        return [item.text for item in self.output if type(item) is _Tag and item.text]
+
+    def get_current_choices(self) -> list:
+        if self.container is not None:
+            return []
+        return [text for text, _ in self.choices]
+
+    def choose_choice_index(self, index: int):
+        if self.container is not None or not 0 <= index < len(self.choices):
+            raise IndexError(f"choice {index} out of range")
+        _, target = self.choices[index]
+        self.choose_path(target)
+
+    def choose_path(self, container: _Container, count_turn: bool = True):
+        self.choices = []
+        self.container = container
+        self.index = 0
+        if count_turn:
+            self.turn += 1
+        self._visit_entered(container, 0, self.previous)
+
+    def get_variable(self, name: str):
+        return self.variables[name]
+
+    def observe_variable(self, name: str, callback):
+        if name not in self.variables:
+            raise KeyError(f"no VAR named {name!r}")
+        self._observers.setdefault(name, []).append(callback)
+
+    def get_visit_count_at_path_string(self, path: str) -> int:
+        container = self.program.containers.get(path)
+        if container is None or container.slot < 0:
+            return 0
+        return self.visits[container.slot]
+
+    def save_state(self) -> str:
+        """JSON of the runtime state, with bink's `variablesState` layout."""
+        defaults = self.program.defaults
+        variables = {
+            name: _save_value(value)
+            for name, value in self.variables.items()
+            if type(value) is not type(defaults.get(name)) or value != defaults[name]
+        }
+        visits = {
+            container.path: count
+            for container, count in zip(self.program.counted, self.visits)
+            if count
+        }
+        return json.dumps(
+            {
+                "choices": [
+                    {"targetPath": target.path, "text": text}
+                    for text, target in self.choices
+                ],
+                "pointer": _save_pointer(self.container, self.index),
+                "previous": _save_pointer(*(self.previous or (None, 0))),
+                "turnIdx": self.turn,
+                "variablesState": variables,
+                "visitCounts": visits,
+            },
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+
+    def load_state(self, saved_state: str):
+        program = self.program
+        state = program._saves.get(saved_state)
+        if state is None:
+            state = self._parse_state(saved_state)
+            if len(program._saves) >= 4096:
+                program._saves.clear()
+            program._saves[saved_state] = state
+        variables, visits, choices, pointer, previous, turn = state
+        self.variables = dict(variables)
+        self.visits = list(visits)
+        self.choices = list(choices)
+        self.container, self.index = pointer or (None, 0)
+        self.previous = previous
+        self.turn = turn
+        self.stack = []
+        self.output = []
+        self.journal = []
+        self.in_eval = False
+        self.str_depth = 0
+        self.safe_exit = False
+
+    def _parse_state(self, saved_state: str):
+        program = self.program
+        data = json.loads(saved_state)
+        if "flows" in data:
+            raise ValueError("saved state comes from bink, not the compiled runtime")
+        containers = program.containers
+        variables = dict(program.defaults)
+        for name, value in data["variablesState"].items():
+            variables[name] = _load_value(value)
+        visits = [0] * len(program.counted)
+        for path, count in data["visitCounts"].items():
+            visits[containers[path].slot] = count
+        choices = tuple(
+            (choice["text"], containers[choice["targetPath"]])
+            for choice in data["choices"]
+        )
+        return (
+            variables,
+            visits,
+            choices,
+            _load_pointer(containers, data["pointer"]),
+            _load_pointer(containers, data["previous"]),
+            data["turnIdx"],
+        )
+
+
+def _save_pointer(container, index: int):
+    return None if container is None else [container.path, index]
+
+
+def _load_pointer(containers: dict, pointer):
+    return None if pointer is None else (containers[pointer[0]], pointer[1])
+
+
+def _read(story):
+    """Lines and tags up to the next choice point."""
+    lines = []
+    while story.can_continue():
+        lines.append((story.cont(), tuple(story.get_current_tags())))
+    return lines
+
+
+def _visits(saved_state: str) -> dict:
+    return json.loads(saved_state)["visitCounts"]
+
+
+def verify(path: str = STORY_PATH, max_depth: int | None = None) -> int:
+    """Walk every branch with bink and CompiledStory side by side.
+
+    Compares lines, tags, choices, VARs, visit counts and state keys after
+    every choice; returns the number of distinct states checked. Raises
+    AssertionError at the first difference.
+    """
+    from bink.story import Story
+    from story_pool import state_key
+
+    with open(path, "r", encoding="utf-8") as file:
+        source = file.read()
+    ink, fast = Story(source), CompiledStory(source)
+    names = list(fast.program.defaults)
+
+    def compare(trail, ink_lines, fast_lines):
+        where = f"after choices {trail}"
+        assert ink_lines == fast_lines, f"lines differ {where}"
+        assert (
+            list(ink.get_current_choices()) == fast.get_current_choices()
+        ), f"choices differ {where}"
+        for name in names:
+            assert ink.get_variable(name) == fast.get_variable(
+                name
+            ), f"VAR {name} differs {where}"
+        ink_state, fast_state = ink.save_state(), fast.save_state()
+        assert _visits(ink_state) == _visits(fast_state), f"visit counts differ {where}"
+        key = state_key(ink_state)
+        assert key == state_key(fast_state), f"state keys differ {where}"
+        return ink_state, fast_state, key
+
+    ink_state, fast_state, key = compare([], _read(ink), _read(fast))
+    seen = {key}
+    frontier = [([], ink_state, fast_state)]
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        next_frontier = []
+        for trail, ink_state, fast_state in frontier:
+            ink.load_state(ink_state)
+            for choice in range(len(ink.get_current_choices())):
+                ink.load_state(ink_state)
+                fast.load_state(fast_state)
+                ink.choose_choice_index(choice)
+                fast.choose_choice_index(choice)
+                branch = trail + [choice]
+                child = compare(branch, _read(ink), _read(fast))
+                if child[2] not in seen:
+                    seen.add(child[2])
+                    next_frontier.append((branch, child[0], child[1]))
+        frontier = next_frontier
+        depth += 1
+    return len(seen)
+
+
+def benchmark(path: str = STORY_PATH, episodes: int = 200, seed: int = 0) -> dict:
+    """Microseconds per line and per load_state for both runtimes."""
+    from bink.story import Story
+
+    with open(path, "r", encoding="utf-8") as file:
+        source = file.read()
+    results = {}
+    for name, runtime in (("bink", Story), ("compiled", CompiledStory)):
+        story = runtime(source)
+        _read(story)
+        initial = story.save_state()
+        rng = np.random.default_rng(seed)
+        lines = loads = 0
+        line_time = load_time = 0.0
+        for _ in range(episodes):
+            start = time.perf_counter()
+            story.load_state(initial)
+            load_time += time.perf_counter() - start
+            loads += 1
+            while True:
+                choices = story.get_current_choices()
+                if not choices:
+                    break
+                story.choose_choice_index(int(rng.integers(len(choices))))
+                start = time.perf_counter()
+                while story.can_continue():
+                    story.cont()
+                    lines += 1
+                line_time += time.perf_counter() - start
+        results[name] = {
+            "line_us": line_time / lines * 1e6,
+            "load_us": load_time / loads * 1e6,
+            "lines": lines,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled ink runtime checks.")
+    parser.add_argument("--story", default=STORY_PATH)
+    parser.add_argument("--verify", action="store_true", help="diff against bink")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--episodes", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.verify:
+        start = time.perf_counter()
+        states = verify(args.story, args.max_depth)
+        elapsed = time.perf_counter() - start
+        print(f"{states} states identical in bink and CompiledStory ({elapsed:.1f} s)")
+
+    results = benchmark(args.story, args.episodes)
+    for name, result in results.items():
+        print(
+            f"{name:<9} {result['line_us']:7.1f} us/line | "
+            f"load_state {result['load_us']:6.1f} us | {result['lines']} lines"
+        )
+    speedup = results["bink"]["line_us"] / results["compiled"]["line_us"]
+    print(f"CompiledStory steps {speedup:.1f}x faster than bink")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Monte Carlo tree search planner for the shrine story.
+
+Plans each decision by simulating from forked env states instead of learning
+a policy, which gives a strong baseline to measure the PPO agent against.
+Works with any env exposing `get_state`/`set_state`/`state_hash`, so both
+the Ink env and the table-driven env can be searched.
+
+The module includes:
+- UniformPolicy: Uniform priors, leaves valued by random rollouts
+- NetworkPolicy: Priors (and optionally values) from a trained ActorCritic
+- MCTSAgent: PUCT search with a transposition table and batched leaf evaluation
+
+Key features:
+- Pluggable policy: anything with `evaluate(observations) -> (priors, values)`
+- Network rollouts played in lockstep on a vector env, one forward pass per
+  step for the whole leaf batch
+- Nodes shared across paths through a table keyed by `env.state_hash()`
+- Leaves collected in batches and evaluated with one policy call
+- Only the choices on offer are ever expanded, so no invalid actions
+"""
+
+import argparse
+import time
+import numpy as np
+
+
+class UniformPolicy:
+    """Uniform priors over the offered choices; values come from rollouts."""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def evaluate(self, observations):
+        priors = [
+            np.full(len(obs["choices"]), 1.0 / max(len(obs["choices"]), 1))
+            for obs in observations
+        ]
+        return priors, None
+
+
+class NetworkPolicy:
+    """Priors and values from a ShrineAgent's ActorCritic, one batch per call.
+
+    With `use_values=False` the critic is ignored and leaves are valued by
+    rollouts that sample from the network priors instead. Given
+    `rollout_envs`, a ShrineVectorEnv of the searched env type, the leaves of
+    a batch are played out together through `agent.act_batch`; otherwise
+    each leaf is played alone, one forward pass per step.
+    """
+
+    def __init__(self, agent, use_values: bool = True, seed=None, rollout_envs=None):
+        self.agent = agent
+        self.use_values = use_values
+        self.rng = np.random.default_rng(seed)
+        self.rollout_envs = rollout_envs
+
+    def evaluate(self, observations):
+        import torch
+
+        agent = self.agent
+        with torch.no_grad():
+            items = torch.tensor(
+                np.stack([obs["items"] for obs in observations]),
+                dtype=torch.float16,
+                device=agent.device,
+            )
+            text = agent.text_batch(observations)
+            action_probs, values = agent.policy(text, items, items)
+
+        action_probs = action_probs.float().cpu().numpy()
+        priors = []
+        for probs, obs in zip(action_probs, observations):
+            probs = probs[: len(obs["choices"])] + 1e-8
+            priors.append(probs / probs.sum())
+        if not self.use_values:
+            return priors, None
+        return priors, values.float().squeeze(1).cpu().numpy()
+
+    def rollout(self, states):
+        """Return of playing each snapshot to the end, batched over rollout_envs.
+
+        Sub-envs that finish early keep auto-resetting until the slowest one
+        ends; their rewards are no longer counted.
+        """
+        import torch
+
+        envs = self.rollout_envs
+        returns = np.zeros(len(states))
+        for start in range(0, len(states), envs.num_envs):
+            count = min(envs.num_envs, len(states) - start)
+            observations = envs.set_states(states[start : start + count])
+            active = np.arange(envs.num_envs) < count
+            while active.any():
+                with torch.no_grad():
+                    actions, _, _ = self.agent.act_batch(observations)
+                observations, rewards, terminated, truncated, _ = envs.step(actions)
+                returns[start : start + count] += np.where(active, rewards, 0.0)[:count]
+                active &= ~(terminated | truncated)
+        return returns
+
+
+class _Node:
+    """Search node: one story state and the statistics of its choices."""
+
+    __slots__ = (
+        "state",
+        "observation",
+        "terminal",
+        "priors",
+        "visits",
+        "value_sum",
+        "rewards",
+        "children",
+    )
+
+    def __init__(self, state, observation, terminal):
+        self.state = state
+        self.observation = observation
+        self.terminal = terminal
+        self.priors = None
+        num_choices = 0 if terminal else len(observation["choices"])
+        self.visits = np.zeros(num_choices, dtype=np.int64)
+        self.value_sum = np.zeros(num_choices, dtype=np.float64)
+        self.rewards = np.zeros(num_choices, dtype=np.float64)
+        self.children = [None] * num_choices
+
+
+class MCTSAgent:
+    """PUCT planner that searches from env snapshots."""
+
+    def __init__(
+        self,
+        policy=None,
+        num_simulations: int = 200,
+        batch_size: int = 8,
+        c_puct: float = 1.5,
+        max_table_size: int = 1_000_000,
+    ):
+        self.policy = policy if policy is not None else UniformPolicy()
+        self.num_simulations = num_simulations
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.max_table_size = max_table_size
+        self.table = {}
+        self._min_q = np.inf
+        self._max_q = -np.inf
+
+    def clear(self):
+        """Forget every searched state."""
+        self.table.clear()
+        self._min_q = np.inf
+        self._max_q = -np.inf
+
+    def act(self, env, observation):
+        """Pick a choice for the env's current state; the env is left unchanged."""
+        root = self.search(env, observation)
+        return int(np.argmax(root.visits))
+
+    def search(self, env, observation):
+        """Run the simulations for the current state and return the root node."""
+        if len(self.table) > self.max_table_size:
+            self.clear()
+
+        start_state = env.get_state()
+        root = self._node(env, observation, False)
+        if root.priors is None:
+            self._evaluate(env, [root])
+
+        remaining = self.num_simulations
+        while remaining > 0 and not root.terminal:
+            leaves = []
+            for _ in range(min(self.batch_size, remaining)):
+                path, leaf = self._select(env, root)
+                leaves.append((path, leaf))
+            remaining -= len(leaves)
+
+            # A leaf reached twice in one batch is evaluated once
+            pending = {id(leaf): leaf for _, leaf in leaves if not leaf.terminal}
+            values = self._evaluate(env, list(pending.values())) if pending else {}
+            for path, leaf in leaves:
+                self._backup(path, values.get(id(leaf), 0.0))
+
+        env.set_state(start_state)
+        return root
+
+    def _node(self, env, observation, terminal):
+        key = env.state_hash()
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = _Node(env.get_state(), observation, terminal)
+        return node
+
+    def _select(self, env, node):
+        """Descend to a leaf, counting the visit on every edge on the way."""
+        path = []
+        while True:
+            action = self._choose(node)
+            node.visits[action] += 1
+            path.append((node, action))
+
+            child = node.children[action]
+            if child is None:
+                env.set_state(node.state)
+                observation, reward, terminated, truncated, _ = env.step(action)
+                node.rewards[action] = reward
+                child = self._node(env, observation, terminated or truncated)
+                node.children[action] = child
+
+            if child.terminal or child.priors is None:
+                return path, child
+            node = child
+
+    def _choose(self, node):
+        total = node.visits.sum()
+        q = np.zeros(len(node.visits))
+        visited = node.visits > 0
+        if visited.any() and self._max_q > self._min_q:
+            q[visited] = node.value_sum[visited] / node.visits[visited]
+            q[visited] = (q[visited] - self._min_q) / (self._max_q - self._min_q)
+        u = self.c_puct * node.priors * np.sqrt(total + 1) / (1 + node.visits)
+        return int(np.argmax(q + u))
+
+    def _evaluate(self, env, nodes):
+        """Set priors on a batch of leaves and return their values by node id."""
+        priors, values = self.policy.evaluate([node.observation for node in nodes])
+        for node, node_priors in zip(nodes, priors):
+            node.priors = node_priors
+        if values is None:
+            if getattr(self.policy, "rollout_envs", None) is not None:
+                values = self.policy.rollout([node.state for node in nodes])
+            else:
+                values = [self._rollout(env, node) for node in nodes]
+        return {id(node): float(value) for node, value in zip(nodes, values)}
+
+    def _rollout(self, env, node):
+        """Return of playing to the end of the episode from a node's state."""
+        env.set_state(node.state)
+        observation, priors, total = node.observation, node.priors, 0.0
+        rng = self.policy.rng
+        while True:
+            action = int(
+                np.searchsorted(np.cumsum(priors), rng.random() * priors.sum())
+            )
+            action = min(action, len(priors) - 1)
+            observation, reward, terminated, truncated, _ = env.step(action)
+            total += reward
+            if terminated or truncated:
+                return total
+            priors = self.policy.evaluate([observation])[0][0]
+
+    def _backup(self, path, value):
+        for node, action in reversed(path):
+            value += node.rewards[action]
+            node.value_sum[action] += value
+            self._min_q = min(self._min_q, value)
+            self._max_q = max(self._max_q, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the shrine story with MCTS")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--simulations", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--ink", action="store_true", help="search the Ink env")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.ink:
+        from env import ReinforcedShrineAdventureEnv
+
+        env = ReinforcedShrineAdventureEnv()
+    else:
+        from tabular_env import TabularShrineEnv
+
+        env = TabularShrineEnv()
+
+    agent = MCTSAgent(
+        UniformPolicy(args.seed),
+        num_simulations=args.simulations,
+        batch_size=args.batch_size,
+    )
+    for episode in range(args.episodes):
+        observation, _ = env.reset()
+        total_reward, decisions, done = 0.0, 0, False
+        start = time.perf_counter()
+        while not done:
+            action = agent.act(env, observation)
+            observation, reward, terminated, truncated, _ = env.step(action)
+            total_reward += reward
+            decisions += 1
+            done = terminated or truncated
+        elapsed = (time.perf_counter() - start) / decisions * 1e3
+        print(
+            f"episode {episode}: return {total_reward:6.2f}, "
+            f"{decisions} decisions, {elapsed:6.2f} ms/decision, "
+            f"{len(agent.table)} states in table"
+        )
+
+
+if __name__ == "__main__":
+    main()
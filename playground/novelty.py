@@ -0,0 +1,215 @@
+"""
+Count-based exploration bonus over (story state, action) visits.
+
+Categorical sampling and the entropy bonus alone keep replaying the opening
+choices the policy already likes. Counting how often each choice has been
+taken from each story state, and paying `scale / sqrt(count)` on top of the
+env reward, pulls the agent toward choices it has rarely or never made.
+
+The module includes:
+- state_digest: Stable 64-bit hash of a story state
+- VisitCounts: Open-addressing (state, action) -> count table in numpy arrays
+- NoveltyBonus: Intrinsic reward computed from a VisitCounts table
+- explore: Endings and states reached by random or count-greedy play
+
+Key features:
+- States are identified by `state_key` (variables, pending choices and
+  passage), hashed with BLAKE2b so keys agree across processes
+- The table is two flat arrays, uint64 keys and uint32 counts, probed
+  linearly; 12 bytes per entry and no Python objects per key
+- With `shared=True` the arrays live in `multiprocessing.shared_memory`;
+  tables pickle as the block name, so vector-env workers built from an
+  `env_fn` holding one all count into the same table
+- Concurrent writers are not locked: a race can lose an increment, which
+  only nudges a bonus
+
+Run from the repository root:
+    python playground/novelty.py --episodes 2000
+"""
+
+import argparse
+import hashlib
+import math
+from multiprocessing import shared_memory
+import numpy as np
+from story_pool import state_key
+
+# Spreads action numbers over the key bits (2^64 / golden ratio)
+_ACTION_MIX = 0x9E3779B97F4A7C15
+_KEY_MASK = (1 << 64) - 1
+
+
+def state_digest(saved_state: str, passage: str = "") -> int:
+    """64-bit hash of a story state, equal in every process."""
+    key = state_key(saved_state, passage).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class VisitCounts:
+    """Visit count per (state digest, action), in a fixed-capacity hash table.
+
+    Capacity is rounded up to a power of two. Inserting beyond `max_load` of
+    it raises RuntimeError rather than letting probes run long.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1 << 20,
+        shared: bool = False,
+        name: str | None = None,
+        max_load: float = 0.75,
+    ):
+        self.capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        self.max_load = max_load
+        self._limit = int(self.capacity * max_load)
+
+        # Layout: int64 entry count, uint64 keys, uint32 counts
+        size = 8 + 12 * self.capacity
+        self.block = None
+        if name is not None:
+            self.block = shared_memory.SharedMemory(name=name)
+        elif shared:
+            self.block = shared_memory.SharedMemory(create=True, size=size)
+        buffer = self.block.buf if self.block is not None else bytearray(size)
+        self._size = np.ndarray((1,), np.int64, buffer, 0)
+        self.keys = np.ndarray((self.capacity,), np.uint64, buffer, 8)
+        self.counts = np.ndarray(
+            (self.capacity,), np.uint32, buffer, 8 + 8 * self.capacity
+        )
+        if name is None:
+            self._size[0] = 0
+            self.keys[:] = 0
+            self.counts[:] = 0
+
+    def __len__(self):
+        return int(self._size[0])
+
+    def __reduce__(self):
+        if self.block is None:
+            return object.__reduce__(self)
+        return (type(self), (self.capacity, True, self.block.name, self.max_load))
+
+    @staticmethod
+    def key(state: int, action: int) -> int:
+        # 0 marks an empty slot, so it is never a key
+        return (state ^ ((action + 1) * _ACTION_MIX)) & _KEY_MASK or 1
+
+    def _slot(self, key: int, insert: bool) -> int:
+        """Slot holding `key`, or the empty slot it belongs in (-1 if absent)."""
+        keys = self.keys
+        mask = self.capacity - 1
+        slot = key & mask
+        while True:
+            stored = int(keys[slot])
+            if stored == key:
+                return slot
+            if stored == 0:
+                if not insert:
+                    return -1
+                if self._size[0] >= self._limit:
+                    raise RuntimeError(
+                        f"visit-count table is full ({len(self)} entries); "
+                        "build it with a larger capacity"
+                    )
+                keys[slot] = key
+                self._size[0] += 1
+                return slot
+            slot = (slot + 1) & mask
+
+    def increment(self, state: int, action: int) -> int:
+        """Count one more visit and return the new count."""
+        slot = self._slot(self.key(state, action), insert=True)
+        self.counts[slot] += 1
+        return int(self.counts[slot])
+
+    def get(self, state: int, action: int) -> int:
+        slot = self._slot(self.key(state, action), insert=False)
+        return int(self.counts[slot]) if slot >= 0 else 0
+
+    def action_counts(self, state: int, num_actions: int) -> np.ndarray:
+        return np.array([self.get(state, a) for a in range(num_actions)])
+
+    def clear(self):
+        self._size[0] = 0
+        self.keys[:] = 0
+        self.counts[:] = 0
+
+    def close(self):
+        """Detach from the shared block; the creator should also `unlink`."""
+        if self.block is not None:
+            del self._size, self.keys, self.counts
+            self.block.close()
+
+    def unlink(self):
+        if self.block is not None:
+            self.block.unlink()
+
+
+class NoveltyBonus:
+    """Intrinsic reward `scale / sqrt(n)` for the n-th visit of (state, action)."""
+
+    def __init__(self, counts: VisitCounts | None = None, scale: float = 0.1):
+        self.counts = counts if counts is not None else VisitCounts()
+        self.scale = scale
+
+    def visit(self, state: int, action: int) -> float:
+        """Count a visit and return its bonus."""
+        return self.scale / math.sqrt(self.counts.increment(state, action))
+
+
+def explore(env, episodes: int, greedy: bool, seed: int = 0):
+    """Play episodes taking random or least-visited choices.
+
+    Returns the episode each distinct ending passage was first reached in
+    and the number of distinct (state, action) pairs taken. Greedy play
+    takes the choice with the fewest visits from the current state, ties
+    broken at random.
+    """
+    rng = np.random.default_rng(seed)
+    counts = VisitCounts()
+    endings = {}
+    env.reset(seed=seed)
+    for episode in range(episodes):
+        observation, _ = env.reset()
+        done = terminated = False
+        while not done:
+            num_choices = int(observation["action_mask"].sum())
+            state = state_digest(env.story.save_state(), env.current_text)
+            if greedy:
+                visits = counts.action_counts(state, num_choices)
+                action = int(rng.choice(np.flatnonzero(visits == visits.min())))
+            else:
+                action = int(rng.integers(num_choices))
+            counts.increment(state, action)
+            observation, _, terminated, truncated, _ = env.step(action)
+            done = terminated or truncated
+        if terminated and not truncated:
+            endings.setdefault(env.current_text, episode)
+    return endings, len(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare how fast random and count-greedy play find endings."
+    )
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from env import ReinforcedShrineAdventureEnv
+
+    env = ReinforcedShrineAdventureEnv()
+    results = {
+        "random": explore(env, args.episodes, greedy=False, seed=args.seed),
+        "count-greedy": explore(env, args.episodes, greedy=True, seed=args.seed),
+    }
+    for policy, (endings, pairs) in results.items():
+        last = max(endings.values()) + 1 if endings else 0
+        print(
+            f"{policy:<14} {len(endings):4d} endings in {args.episodes} episodes, "
+            f"last new one in episode {last}; {pairs:,} (state, action) pairs"
+        )
+
+
+if __name__ == "__main__":
+    main()
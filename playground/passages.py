@@ -0,0 +1,68 @@
+"""
+Passage buffer for collecting story output.
+
+A passage is everything the story prints between two choice points. Building
+it with repeated `+=` copies the text once per line; collecting the lines in
+a list and joining them once keeps the cost linear in the passage length.
+
+The module includes:
+- PassageBuffer: Reads one passage at a time and keeps a ring of recent passages
+
+Key features:
+- One join per passage, reusing the same fragment list every step
+- Optional bounded history of the last K passages
+- Optional collection of the tags printed with the passage
+- Passages interned in the process-wide string table, so repeats share one copy
+"""
+
+from collections import deque
+from strings import get_string_table
+
+
+class PassageBuffer:
+    """Collects story lines into passages and remembers the last few."""
+
+    def __init__(self, history_size: int = 0, tags: bool = False):
+        self._fragments = []
+        self.history = deque(maxlen=history_size) if history_size > 0 else None
+        self.strings = get_string_table()
+        self.text = ""
+        self.text_id = self.strings.intern("")
+        # Tags of every line in the passage, only read when asked for
+        self.tags = [] if tags else None
+
+    def read(self, story) -> str:
+        """Continue the story to its next choice point and return the passage."""
+        fragments = self._fragments
+        fragments.clear()
+        tags = self.tags
+        if tags is None:
+            while story.can_continue():
+                fragments.append(story.cont())
+        else:
+            tags.clear()
+            while story.can_continue():
+                fragments.append(story.cont())
+                tags.extend(story.get_current_tags())
+        # Every line keeps a trailing newline, as the env always emitted them
+        self.push("\n".join(fragments) + "\n" if fragments else "")
+        return self.text
+
+    def push(self, text: str):
+        """Make text the current passage and add it to the history."""
+        self.set_text(text)
+        if self.history is not None:
+            self.history.append(self.text)
+
+    def set_text(self, text: str):
+        """Make text the current passage without adding it to the history."""
+        self.text_id = self.strings.intern(text)
+        self.text = self.strings[self.text_id]
+
+    def clear(self):
+        """Forget the current passage and the history."""
+        self.set_text("")
+        if self.tags is not None:
+            self.tags.clear()
+        if self.history is not None:
+            self.history.clear()
@@ -0,0 +1,214 @@
+"""
+Coverage and hot-path profiling for the shrine environment.
+
+Shows which parts of the story rollouts actually reach and where the time in
+`step` goes, without touching the environment used for training.
+
+The module includes:
+- story_knots: Paths of every knot and stitch in a compiled story
+- EnvProfile: Aggregated visit counts and timings, shareable between envs
+- ProfiledShrineEnv: ReinforcedShrineAdventureEnv that records into an EnvProfile
+
+Key features:
+- Knot/stitch visits read from the story's own visit counters once per episode
+- Per-choice offered/taken counts, so never-taken branches stand out
+- Wall time of `story.cont()`, `choose_choice_index` and reward calculation
+- Text report, or collapsed stacks for flamegraph.pl / speedscope
+
+Run from the repository root:
+    python playground/profiler.py --episodes 2000
+    python playground/profiler.py --collapsed results/env.folded
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+import numpy as np
+from env import ReinforcedShrineAdventureEnv
+
+_SECTIONS = ("cont", "choose_choice_index", "calculate_reward")
+
+
+def story_knots(source: str):
+    """Paths of the knots and stitches declared in a compiled story."""
+    named = json.loads(source)["root"][-1]
+    paths = []
+    for knot, content in named.items():
+        if knot in ("global decl", "#f") or not isinstance(content, list):
+            continue
+        paths.append(knot)
+        if isinstance(content[-1], dict):
+            for stitch, inner in content[-1].items():
+                if isinstance(inner, list):
+                    paths.append(f"{knot}.{stitch}")
+    return paths
+
+
+class EnvProfile:
+    """Visit counts and timings collected from one or more profiled envs."""
+
+    def __init__(self, knots):
+        self.knots = list(knots)
+        self.knot_visits = np.zeros(len(self.knots), dtype=np.int64)
+        self.choices_offered = Counter()
+        self.choices_taken = Counter()
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.episodes = 0
+
+    def add_time(self, section: str, seconds: float):
+        self.calls[section] += 1
+        self.seconds[section] += seconds
+
+    def report(self) -> str:
+        """Human-readable summary of coverage and step time."""
+        lines = [f"Episodes: {self.episodes}", "", "Knot/stitch visits:"]
+        for knot, visits in zip(self.knots, self.knot_visits):
+            marker = "  <- never reached" if visits == 0 else ""
+            lines.append(f"  {visits:10d}  {knot}{marker}")
+
+        lines += ["", "Choices (taken / offered):"]
+        for choice, offered in self.choices_offered.most_common():
+            taken = self.choices_taken[choice]
+            marker = "  <- never taken" if taken == 0 else ""
+            lines.append(f"  {taken:8d} / {offered:8d}  {choice}{marker}")
+
+        step_time = self.seconds["step"] or 1.0
+        lines += [
+            "",
+            "Time:",
+            f"  {'section':22s} {'calls':>9s} {'mean us':>9s} {'share':>7s}",
+        ]
+        for section in ("step", *_SECTIONS, "reset"):
+            calls = self.calls[section]
+            if calls:
+                seconds = self.seconds[section]
+                lines.append(
+                    f"  {section:22s} {calls:9d} {seconds / calls * 1e6:9.1f} "
+                    f"{seconds / step_time:7.1%}"
+                )
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Time as collapsed stacks in microseconds, the flamegraph input format."""
+        inside = sum(self.seconds[section] for section in _SECTIONS)
+        stacks = {f"step;{section}": self.seconds[section] for section in _SECTIONS}
+        stacks["step"] = max(self.seconds["step"] - inside, 0.0)
+        stacks["reset"] = self.seconds["reset"]
+        return "\n".join(
+            f"{stack} {round(seconds * 1e6)}"
+            for stack, seconds in stacks.items()
+            if seconds > 0
+        )
+
+
+class ProfiledShrineEnv(ReinforcedShrineAdventureEnv):
+    """Shrine env that records coverage and timings into an EnvProfile.
+
+    Pass the same profile to several envs to aggregate across rollouts.
+    """
+
+    def __init__(self, profile: EnvProfile | None = None, **kwargs):
+        self.profile = profile
+        self._episode_open = False
+        super().__init__(**kwargs)
+        if self.profile is None:
+            self.profile = EnvProfile(story_knots(self.template.source))
+        self._timed_story()
+
+    def _timed_story(self):
+        """Time the story calls made by step through instance attributes.
+
+        The story comes from the shared pool, so close() removes them again.
+        """
+        story, profile = self.story, self.profile
+        cont = story.cont
+        choose = story.choose_choice_index
+
+        def timed_cont():
+            start = time.perf_counter()
+            line = cont()
+            profile.add_time("cont", time.perf_counter() - start)
+            return line
+
+        def timed_choose(index):
+            start = time.perf_counter()
+            choose(index)
+            profile.add_time("choose_choice_index", time.perf_counter() - start)
+
+        story.cont = timed_cont
+        story.choose_choice_index = timed_choose
+
+    def step(self, action):
+        choices = self.current_choices
+        self.profile.choices_offered.update(choices)
+        if action < len(choices):
+            self.profile.choices_taken[choices[action]] += 1
+
+        start = time.perf_counter()
+        result = super().step(action)
+        self.profile.add_time("step", time.perf_counter() - start)
+
+        if result[2] or result[3]:
+            self._end_episode()
+        return result
+
+    def calculate_reward(self) -> float:
+        start = time.perf_counter()
+        reward = super().calculate_reward()
+        self.profile.add_time("calculate_reward", time.perf_counter() - start)
+        return reward
+
+    def reset(self, *, seed=None, options=None):
+        if self._episode_open and self.episode_steps > 0:
+            self._end_episode()
+        start = time.perf_counter()
+        result = super().reset(seed=seed, options=options)
+        if self.profile is not None:
+            self.profile.add_time("reset", time.perf_counter() - start)
+        self._episode_open = True
+        return result
+
+    def _end_episode(self):
+        """Add the story's visit counters for the finished episode."""
+        # Counters restart with every load_state, so they cover this episode only
+        count = self.story.get_visit_count_at_path_string
+        self.profile.knot_visits += [count(knot) for knot in self.profile.knots]
+        self.profile.episodes += 1
+        self._episode_open = False
+
+    def close(self):
+        if self.story is not None:
+            for name in ("cont", "choose_choice_index"):
+                self.story.__dict__.pop(name, None)
+        super().close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile random rollouts.")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--collapsed", help="write collapsed stacks to this file")
+    args = parser.parse_args()
+
+    env = ProfiledShrineEnv()
+    rng = np.random.default_rng(args.seed)
+    for _ in range(args.episodes):
+        observation, _ = env.reset()
+        done = False
+        while not done:
+            action = int(rng.integers(len(observation["choices"])))
+            observation, _, terminated, truncated, _ = env.step(action)
+            done = terminated or truncated
+    env.close()
+
+    print(env.profile.report())
+    if args.collapsed:
+        with open(args.collapsed, "w", encoding="utf-8") as file:
+            file.write(env.profile.collapsed() + "\n")
+        print(f"\nWrote {args.collapsed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Reward rules loaded from a spec file and compiled into a phrase matcher.
+
+The dialogue part of the reward is a set of weighted phrases, matched with
+one `in` test per phrase. Passages repeat across episodes, so each distinct
+passage is scored once and its score memoized.
+
+The module includes:
+- PhraseMatcher: Weighted substring matching with per-passage memoization
+- RewardSpec: Dialogue matcher plus the survival/preparation shaping terms
+- RewardTags: Reward tags (`# reward:+5`) compiled from a story's JSON
+- get_reward_spec: Process-wide cached spec lookup keyed by path
+
+Key features:
+- Rules live in `rewards.toml` next to this module
+- Each phrase counts at most once per passage
+- Scores are memoized per unique passage
+- Tagged lines score by their tag, so rewards survive rewording the prose
+"""
+
+import json
+import os
+import tomllib
+
+REWARDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rewards.toml")
+
+
+class PhraseMatcher:
+    """Weighted phrases, scoring the text they occur in."""
+
+    def __init__(self, phrases, max_cache_size: int = 65536):
+        self.weights = []
+        self.phrases = []
+        for phrase, weight in phrases:
+            self.phrases.append(phrase.lower())
+            self.weights.append(float(weight))
+
+        self._cache = {}
+        self._max_cache_size = max_cache_size
+
+    def matches(self, text: str) -> set:
+        """Indices of every phrase found in text."""
+        text = text.lower()
+        return {i for i, phrase in enumerate(self.phrases) if phrase in text}
+
+    def score(self, text: str) -> float:
+        """Sum of the weights of the phrases in text, memoized per passage."""
+        reward = self._cache.get(text)
+        if reward is None:
+            reward = sum(self.weights[i] for i in self.matches(text))
+            if len(self._cache) >= self._max_cache_size:
+                self._cache.clear()
+            self._cache[text] = reward
+        return reward
+
+
+class RewardSpec:
+    """Reward rules read from a TOML spec."""
+
+    def __init__(self, path: str = REWARDS_PATH):
+        with open(path, "rb") as file:
+            spec = tomllib.load(file)
+
+        shaping = spec.get("shaping", {})
+        self.survival = float(shaping.get("survival", 0.0))
+        self.well_prepared = float(shaping.get("well_prepared", 0.0))
+        self.prepared_items = tuple(shaping.get("prepared_items", ()))
+
+        self.dialogue = PhraseMatcher(
+            (phrase, rule["reward"])
+            for rule in spec.get("dialogue", [])
+            for phrase in rule["phrases"]
+        )
+
+
+class RewardTags:
+    """Reward tags of a compiled story, parsed once when the story loads.
+
+    Authors mark a line with `# reward:+5`; every time the line is printed,
+    its reward is added to the step. Only static tags are compiled, the
+    ones whose text doesn't depend on story logic.
+    """
+
+    prefix = "reward:"
+
+    def __init__(self, source: str):
+        # Value of each reward tag's text
+        self.values = {}
+        self._scan(json.loads(source)["root"], "")
+
+    def __bool__(self):
+        return bool(self.values)
+
+    def _scan(self, container, path):
+        tag, tag_path = None, None
+        for index, token in enumerate(container):
+            if token == "#":
+                tag, tag_path = [], _join(path, index)
+            elif token == "/#":
+                if tag is not None:
+                    self._add("".join(tag).strip(), tag_path)
+                tag = None
+            elif tag is not None:
+                # Tags built from evaluated content can't be known in advance
+                if isinstance(token, str) and token.startswith("^"):
+                    tag.append(token[1:])
+                else:
+                    tag = None
+            elif isinstance(token, list):
+                self._scan(token, _join(path, _container_name(token) or index))
+            elif isinstance(token, dict) and index == len(container) - 1:
+                for name, inner in token.items():
+                    if isinstance(inner, list):
+                        self._scan(inner, _join(path, name))
+
+    def _add(self, text: str, path: str):
+        if not text.startswith(self.prefix):
+            return
+        try:
+            value = float(text[len(self.prefix) :])
+        except ValueError:
+            raise ValueError(f"bad reward tag {text!r} at {path}") from None
+        self.values[text] = value
+
+    def score(self, tags) -> float:
+        """Total reward of the tags printed during a passage."""
+        values = self.values
+        return sum(values.get(tag, 0.0) for tag in tags)
+
+
+def _join(path: str, name) -> str:
+    return f"{path}.{name}" if path else str(name)
+
+
+def _container_name(container) -> str | None:
+    flags = container[-1] if container else None
+    return flags.get("#n") if isinstance(flags, dict) else None
+
+
+_specs = {}
+
+
+def get_reward_spec(path: str = REWARDS_PATH) -> RewardSpec:
+    """Return the process-wide reward spec for a file, compiling it on first use."""
+    spec = _specs.get(path)
+    if spec is None:
+        spec = _specs[path] = RewardSpec(path)
+    return spec
@@ -0,0 +1,194 @@
+"""
+Exact solver for the shrine story by backward induction over the story graph.
+
+The compiled story graph already holds every branch reachable within the
+env's step limit, so the optimal return can be computed exactly instead of
+estimated from thousands of episodes.
+
+The module includes:
+- solve: Optimal value and action for every (steps taken, state) pair
+- Solution: Loaded solution with value/action lookups and regret reporting
+- load_solution: Cached solution, recomputed when the graph or rewards change
+
+Key features:
+- Same reward semantics as the env: dialogue, survival, the well-prepared
+  terminal bonus, `max_steps` truncation and the -1 invalid-action ending
+- Follows the env's action width (`max_choices`): choices past it are out of
+  reach, and actions past a state's choices end the episode
+- One vectorized pass per step count, memoized on the graph state id
+- Results stored in `story/json/story.solution.npz` next to the graph
+
+Run from the repository root:
+    python playground/solver.py            # solve and print the optimal path
+"""
+
+import argparse
+import hashlib
+import numpy as np
+from env import MAX_CHOICES
+from rewards import get_reward_spec
+from story_graph import StoryGraph
+
+SOLUTION_PATH = "story/json/story.solution.npz"
+INVALID_REWARD = -1.0
+
+
+def _signature(graph: StoryGraph, spec, max_steps: int, max_choices: int) -> str:
+    """Fingerprint of everything the solution depends on."""
+    digest = hashlib.sha1()
+    for array in (graph.choice_start, graph.successor, graph.item_bits):
+        digest.update(array.tobytes())
+    digest.update(graph.dialogue_reward.tobytes())
+    digest.update(
+        repr(
+            (
+                spec.survival,
+                spec.well_prepared,
+                spec.prepared_items,
+                max_steps,
+                max_choices,
+            )
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def solve(
+    graph: StoryGraph, max_steps: int = 20, spec=None, num_actions: int = MAX_CHOICES
+):
+    """Backward induction over every (steps taken, state) pair.
+
+    Returns:
+        value: float32[max_steps + 1, N] best return from each state
+        action: int8[max_steps + 1, N] action reaching it (-1 at terminal states)
+    """
+    spec = spec if spec is not None else get_reward_spec()
+    if max_steps > graph.max_depth:
+        raise ValueError(
+            f"max_steps={max_steps} exceeds the graph's max_depth={graph.max_depth}"
+        )
+
+    num_states = graph.num_states
+    num_choices = graph.num_choices
+    has_choices = num_choices > 0
+    starts = graph.choice_start[:-1][has_choices]
+
+    # Per-edge terms that don't depend on the step count
+    successor = np.maximum(graph.successor, 0)
+    prepared_mask = sum(
+        1 << graph.item_names.index(name) for name in spec.prepared_items
+    )
+    well_prepared = (graph.item_bits & prepared_mask) == prepared_mask
+    ends_story = num_choices[successor] == 0
+    dialogue = graph.dialogue_reward[successor].astype(np.float64)
+    bonus = np.where(well_prepared, spec.well_prepared, 0.0)
+    edge_slot = np.arange(len(successor)) - np.repeat(
+        graph.choice_start[:-1], num_choices
+    )
+
+    # Choices past the action width can never be picked
+    reachable = edge_slot < num_actions
+
+    value = np.zeros((max_steps + 1, num_states), dtype=np.float64)
+    action = np.full((max_steps + 1, num_states), -1, dtype=np.int8)
+    for steps in range(max_steps - 1, -1, -1):
+        truncated = steps + 1 >= max_steps
+        done = ends_story | truncated
+        q = dialogue + np.where(done, bonus, spec.survival)
+        if not truncated:
+            q = q + np.where(done, 0.0, value[steps + 1, successor])
+        q = np.where(reachable, q, -np.inf)
+
+        best = np.maximum.reduceat(q, starts)
+        # First edge reaching the best value, as argmax would pick
+        is_best = q == np.repeat(best, num_choices[has_choices])
+        first = np.minimum.reduceat(np.where(is_best, edge_slot, num_actions), starts)
+
+        # Picking a missing choice ends the episode with -1
+        can_quit = num_choices[has_choices] < num_actions
+        quit_better = can_quit & (INVALID_REWARD > best)
+        value[steps, has_choices] = np.where(quit_better, INVALID_REWARD, best)
+        action[steps, has_choices] = np.where(
+            quit_better, num_choices[has_choices], first
+        )
+
+    return value.astype(np.float32), action
+
+
+class Solution:
+    """Optimal values and actions for every state of a story graph."""
+
+    def __init__(self, value, action, max_steps: int):
+        self.value = value
+        self.action = action
+        self.max_steps = max_steps
+
+    @property
+    def optimal_return(self) -> float:
+        """Best achievable return of a whole episode."""
+        return float(self.value[0, 0])
+
+    def best_action(self, state: int, steps: int) -> int:
+        """Optimal action at a graph state after `steps` choices."""
+        return int(self.action[steps, state])
+
+    def regret(self, episode_return: float) -> float:
+        """Return lost against optimal play over a whole episode."""
+        return self.optimal_return - episode_return
+
+
+def load_solution(
+    graph: StoryGraph | None = None,
+    max_steps: int = 20,
+    path: str = SOLUTION_PATH,
+    max_choices: int = MAX_CHOICES,
+) -> Solution:
+    """Load the cached solution, solving again if it is missing or stale.
+
+    `max_choices` is the action width of the env the solution is for.
+    """
+    graph = graph if graph is not None else StoryGraph()
+    signature = _signature(graph, get_reward_spec(), max_steps, max_choices)
+    try:
+        data = np.load(path)
+        if str(data["signature"]) == signature:
+            return Solution(data["value"], data["action"], max_steps)
+    except FileNotFoundError:
+        pass
+
+    value, action = solve(graph, max_steps, num_actions=max_choices)
+    np.savez_compressed(path, value=value, action=action, signature=signature)
+    return Solution(value, action, max_steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the shrine story exactly.")
+    parser.add_argument("--max-steps", type=int, default=20)
+    parser.add_argument("--max-choices", type=int, default=MAX_CHOICES)
+    parser.add_argument("--output", default=SOLUTION_PATH)
+    args = parser.parse_args()
+
+    graph = StoryGraph()
+    solution = load_solution(graph, args.max_steps, args.output, args.max_choices)
+    print(f"Optimal return: {solution.optimal_return:.2f}")
+
+    # Replay the optimal path through the Ink env to confirm the value
+    from env import ReinforcedShrineAdventureEnv
+
+    env = ReinforcedShrineAdventureEnv(max_choices=args.max_choices)
+    observation, _ = env.reset()
+    state, total, done = 0, 0.0, False
+    for steps in range(args.max_steps):
+        action = solution.best_action(state, steps)
+        if action < len(observation["choices"]):
+            print(f"{steps + 1:2d}. {observation['choices'][action]}")
+            state = int(graph.successor[graph.choice_start[state] + action])
+        observation, reward, done, truncated, _ = env.step(action)
+        total += reward
+        if done or truncated:
+            break
+    print(f"Replayed return: {total:.2f}")
+
+
+if __name__ == "__main__":
+    main()
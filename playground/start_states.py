@@ -0,0 +1,172 @@
+"""
+Bank of mid-story start states for curriculum resets.
+
+Every episode normally starts at the first knot, so knots deep in the story
+see only a small share of the rollout steps. A start-state bank holds
+snapshots taken all over the story, grouped by knot, and an env given a bank
+resets to one of them, drawing the knot by configurable weights.
+
+The module includes:
+- StartStateBank: Snapshots grouped by knot, with weighted sampling
+- build_bank: Fills a bank by rollouts that restart from the bank itself
+
+Key features:
+- Snapshots are the env's own `get_state()` tuples, serialized as JSON
+- A bank records the story runtime that saved it; envs on another runtime
+  refuse it, since saved states only load into the runtime that wrote them
+- Building restarts from knots chosen uniformly, so rarely reached knots
+  are explored as often as the opening
+- Sampling uses the env's seeded `np_random`, so resets stay reproducible
+
+Run from the repository root:
+    python playground/start_states.py --episodes 5000
+"""
+
+import argparse
+import json
+import numpy as np
+from story_pool import RUNTIMES, state_key, state_knot
+
+STATES_PATH = "story/json/story.starts.json"
+
+
+class StartStateBank:
+    """Env snapshots grouped by knot, sampled by per-knot weight."""
+
+    def __init__(self, states=None, weights=None, runtime: str = "bink"):
+        self.runtime = runtime
+        self.states = {}
+        self.weights = {}
+        for knot, snapshots in (states or {}).items():
+            for snapshot in snapshots:
+                self.add(snapshot, knot)
+        self.set_weights(weights or {})
+
+    def add(self, snapshot, knot: str | None = None):
+        knot = knot if knot is not None else state_knot(snapshot[0])
+        self.states.setdefault(knot, []).append(snapshot)
+
+    def set_weights(self, weights):
+        """Relative chance of starting in each knot; unlisted knots weigh 1."""
+        self.weights = dict(weights)
+
+    def counts(self):
+        return {knot: len(snapshots) for knot, snapshots in self.states.items()}
+
+    def sample(self, rng):
+        """Draw a knot by weight, then one of its snapshots uniformly."""
+        knots = list(self.states)
+        weights = np.array([self.weights.get(knot, 1.0) for knot in knots])
+        if weights.sum() <= 0:
+            raise ValueError("every knot in the start-state bank has weight 0")
+        knot = knots[rng.choice(len(knots), p=weights / weights.sum())]
+        snapshots = self.states[knot]
+        return knot, snapshots[rng.integers(len(snapshots))]
+
+    def save(self, path: str = STATES_PATH):
+        data = {
+            knot: [
+                [saved, variables.tolist(), steps, done, text, choices]
+                for saved, variables, steps, done, text, choices, _ in snapshots
+            ]
+            for knot, snapshots in self.states.items()
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"runtime": self.runtime, "weights": self.weights, "states": data},
+                file,
+            )
+
+    @classmethod
+    def load(cls, path: str = STATES_PATH, weights=None):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"{path} not found; build it with `python playground/start_states.py`"
+            ) from None
+
+        states = {
+            knot: [
+                (
+                    saved,
+                    np.array(variables, dtype=np.float32),
+                    steps,
+                    done,
+                    text,
+                    choices,
+                    None,
+                )
+                for saved, variables, steps, done, text, choices in snapshots
+            ]
+            for knot, snapshots in data["states"].items()
+        }
+        weights = weights if weights is not None else data["weights"]
+        return cls(states, weights, data.get("runtime", "bink"))
+
+
+def build_bank(env, episodes: int = 5000, per_knot: int = 256, seed: int = 0):
+    """Collect snapshots by random rollouts, each restarting in a random knot.
+
+    Each knot keeps at most `per_knot` distinct states (reservoir sampled).
+    """
+    rng = np.random.default_rng(seed)
+    bank = StartStateBank(runtime=env.template.runtime)
+    seen = set()
+    offered = {}
+
+    def collect():
+        snapshot = env.get_state()
+        key = state_key(snapshot[0], snapshot[4])
+        if key in seen:
+            return
+        seen.add(key)
+        knot = state_knot(snapshot[0])
+        offered[knot] = offered.get(knot, 0) + 1
+        snapshots = bank.states.setdefault(knot, [])
+        if len(snapshots) < per_knot:
+            snapshots.append(snapshot)
+        else:
+            slot = rng.integers(offered[knot])
+            if slot < per_knot:
+                snapshots[slot] = snapshot
+
+    # The env restarts from states collected so far, every knot weighing the same
+    env.start_states = bank
+    env.reset(seed=seed)
+    for _ in range(episodes):
+        observation, _ = env.reset()
+        collect()
+        done = False
+        while not done:
+            action = int(rng.integers(len(observation["choices"])))
+            observation, _, terminated, truncated, _ = env.step(action)
+            done = terminated or truncated
+            if not done:
+                collect()
+    env.start_states = None
+    return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the start-state bank.")
+    parser.add_argument("--episodes", type=int, default=5000)
+    parser.add_argument("--per-knot", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=STATES_PATH)
+    parser.add_argument("--runtime", choices=sorted(RUNTIMES), default="bink")
+    args = parser.parse_args()
+
+    from env import ReinforcedShrineAdventureEnv
+
+    env = ReinforcedShrineAdventureEnv(runtime=args.runtime)
+    bank = build_bank(env, args.episodes, args.per_knot, args.seed)
+    bank.save(args.output)
+    for knot, count in bank.counts().items():
+        print(f"{count:6d}  {knot}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
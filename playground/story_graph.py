@@ -0,0 +1,268 @@
+"""
+Offline compiler that turns the compiled Ink story into a transition table.
+
+The story is a finite choice graph, so instead of interpreting Ink on every
+environment step it can be explored once and stored as flat arrays.
+
+The module includes:
+- compile_story: Breadth-first exploration of every reachable branch
+- StoryGraph: Loaded transition table with a shared string table
+- verify_graph: Replays random episodes through both environments and compares them
+
+Artifact layout (`story/json/story.graph.npz`):
+- passage: int32[N] string id of the text produced on arriving at each state
+- choice_start: int32[N + 1] offsets into the per-choice arrays
+- choice_text: int32[E] string id of each choice label
+- successor: int32[E] state reached by each choice (-1 beyond `max_depth`)
+- item_bits: uint8[E] items held after each choice, one bit per env item
+- variables: int16[N, V] Ink VAR values at each state
+- dialogue_reward: float32[N] dialogue and reward-tag part of the env reward
+  for each passage
+- depth: int16[N] fewest choices needed to reach each state
+- strings / string_offsets: UTF-8 string table
+
+Key features:
+- States are merged by variables, pending choices and passage, not by history
+- Exploration stops at `max_depth` choices, matching the env's `max_steps`
+- No pickled objects; everything is plain numpy arrays
+
+Run from the repository root:
+    python playground/story_graph.py            # compile
+    python playground/story_graph.py --verify   # compare against the Ink env
+"""
+
+import argparse
+import time
+import numpy as np
+from env import ITEM_NAMES, ReinforcedShrineAdventureEnv
+from passages import PassageBuffer
+from story_pool import STORY_PATH, get_template, state_key
+from strings import StringTable
+
+GRAPH_PATH = "story/json/story.graph.npz"
+
+
+def compile_story(max_depth: int = 20, path: str = STORY_PATH, verbose=True):
+    """Explore every branch reachable within max_depth choices."""
+    template = get_template(path)
+    story = template.acquire()
+    mirror = template.variables(story)
+    reader = PassageBuffer(tags=bool(template.reward_tags))
+    probe = ReinforcedShrineAdventureEnv(story_path=path)
+
+    strings = StringTable()
+
+    # Per-state records
+    passages, depths, variables, rewards, choices = [], [], [], [], []
+    keys = {}
+
+    def add_state(saved_state, passage, state_choices, depth, tags=()):
+        passage_id = strings.intern(passage)
+        key = state_key(saved_state, str(passage_id))
+        state_id = keys.get(key)
+        if state_id is None:
+            state_id = keys[key] = len(passages)
+            passages.append(passage_id)
+            depths.append(depth)
+            mirror.sync(saved_state)
+            variables.append(mirror.vector.astype(np.int16))
+            rewards.append(probe.dialogue_reward(passage, tags))
+            choices.append([strings.intern(text) for text in state_choices])
+            return state_id, True
+        return state_id, False
+
+    root_state = template.initial_state
+    add_state(root_state, template.initial_text, list(template.initial_choices), 0)
+
+    edges = {}
+    frontier = [(0, root_state)]
+    start = time.perf_counter()
+    for depth in range(max_depth):
+        next_frontier = []
+        for state_id, saved_state in frontier:
+            successors = []
+            for index in range(len(choices[state_id])):
+                story.load_state(saved_state)
+                story.choose_choice_index(index)
+                passage = reader.read(story)
+                child_state = story.save_state()
+                child_id, is_new = add_state(
+                    child_state,
+                    passage,
+                    list(story.get_current_choices()),
+                    depth + 1,
+                    reader.tags or (),
+                )
+                # States at max_depth are never expanded, so drop their snapshot
+                if is_new and depth + 1 < max_depth:
+                    next_frontier.append((child_id, child_state))
+                successors.append(child_id)
+            edges[state_id] = successors
+        frontier = next_frontier
+        if verbose:
+            print(
+                f"depth {depth + 1:2d}: {len(passages):7d} states, "
+                f"{len(frontier):6d} new, {time.perf_counter() - start:6.1f}s"
+            )
+
+    template.release(story)
+    probe.close()
+
+    # Flatten into CSR-style arrays
+    num_states = len(passages)
+    counts = np.array([len(state_choices) for state_choices in choices])
+    choice_start = np.zeros(num_states + 1, dtype=np.int32)
+    choice_start[1:] = np.cumsum(counts)
+    choice_text = np.empty(choice_start[-1], dtype=np.int32)
+    successor = np.full(choice_start[-1], -1, dtype=np.int32)
+
+    for state_id, state_choices in enumerate(choices):
+        offset = choice_start[state_id]
+        choice_text[offset : offset + len(state_choices)] = state_choices
+        if state_id in edges:
+            successor[offset : offset + len(state_choices)] = edges[state_id]
+
+    # Items held once a choice is taken, as bits over ITEM_NAMES
+    variables = np.array(variables, dtype=np.int16)
+    item_columns = [template.variable_names.index(name) for name in ITEM_NAMES]
+    held = (variables[:, item_columns] != 0).astype(np.uint8)
+    state_items = (held << np.arange(len(ITEM_NAMES), dtype=np.uint8)).sum(
+        axis=1, dtype=np.uint8
+    )
+    item_bits = np.where(successor >= 0, state_items[successor], 0).astype(np.uint8)
+
+    blob, offsets = strings.pack()
+    return {
+        "passage": np.array(passages, dtype=np.int32),
+        "choice_start": choice_start,
+        "choice_text": choice_text,
+        "successor": successor,
+        "item_bits": item_bits,
+        "variables": variables,
+        "variable_names": np.array(template.variable_names),
+        "item_names": np.array(ITEM_NAMES),
+        "dialogue_reward": np.array(rewards, dtype=np.float32),
+        "depth": np.array(depths, dtype=np.int16),
+        "max_depth": np.int32(max_depth),
+        "strings": blob,
+        "string_offsets": offsets,
+    }
+
+
+class StoryGraph:
+    """Transition table produced by compile_story, loaded for fast lookups."""
+
+    def __init__(self, path: str = GRAPH_PATH):
+        try:
+            data = np.load(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"{path} not found; build it with `python playground/story_graph.py`"
+            ) from None
+
+        self.passage = data["passage"]
+        self.choice_start = data["choice_start"]
+        self.choice_text = data["choice_text"]
+        self.successor = data["successor"]
+        self.item_bits = data["item_bits"]
+        self.variables = data["variables"]
+        self.variable_names = [str(name) for name in data["variable_names"]]
+        self.item_names = [str(name) for name in data["item_names"]]
+        self.dialogue_reward = data["dialogue_reward"]
+        self.depth = data["depth"]
+        self.max_depth = int(data["max_depth"])
+        self.num_choices = np.diff(self.choice_start).astype(np.int32)
+
+        blob = data["strings"].tobytes()
+        offsets = data["string_offsets"]
+        self.strings = [
+            blob[offsets[i] : offsets[i + 1]].decode("utf-8")
+            for i in range(len(offsets) - 1)
+        ]
+
+    @property
+    def num_states(self) -> int:
+        return len(self.passage)
+
+    def text(self, state: int) -> str:
+        """Passage shown on arriving at a state."""
+        return self.strings[self.passage[state]]
+
+    def attributes(self, names) -> np.ndarray:
+        """float32[N, len(names)] values of the named VARs at every state."""
+        columns = [self.variable_names.index(name) for name in names]
+        return self.variables[:, columns].astype(np.float32)
+
+    def choices(self, state: int) -> list:
+        """Choice labels offered at a state."""
+        start, stop = self.choice_start[state], self.choice_start[state + 1]
+        return [self.strings[i] for i in self.choice_text[start:stop]]
+
+
+def verify_graph(graph: StoryGraph, episodes: int = 1000, seed: int = 0) -> int:
+    """Run random episodes through the Ink env and the tabular env side by side.
+
+    Returns:
+        Number of episodes whose trajectories differed
+    """
+    from tabular_env import TabularShrineEnv
+
+    reference = ReinforcedShrineAdventureEnv()
+    tabular = TabularShrineEnv(graph)
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+
+    for _ in range(episodes):
+        expected, _ = reference.reset()
+        actual, _ = tabular.reset()
+        done = truncated = False
+        same = True
+        while same and not done and not truncated:
+            # Mostly valid choices, occasionally an invalid one
+            num_choices = len(expected["choices"])
+            if rng.random() < 0.05:
+                action = num_choices
+            else:
+                action = int(rng.integers(num_choices))
+            expected, reward, done, truncated, _ = reference.step(action)
+            actual, tab_reward, tab_done, tab_truncated, _ = tabular.step(action)
+            same = (
+                expected["text"] == actual["text"]
+                and list(expected["choices"]) == actual["choices"]
+                and np.array_equal(expected["items"], actual["items"])
+                and np.array_equal(expected["attributes"], actual["attributes"])
+                and np.array_equal(expected["action_mask"], actual["action_mask"])
+                and np.isclose(reward, tab_reward)
+                and done == tab_done
+                and truncated == tab_truncated
+            )
+        mismatches += not same
+
+    reference.close()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the story graph.")
+    parser.add_argument("--max-depth", type=int, default=20)
+    parser.add_argument("--output", default=GRAPH_PATH)
+    parser.add_argument("--verify", action="store_true")
+    parser.add_argument("--episodes", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.verify:
+        mismatches = verify_graph(StoryGraph(args.output), args.episodes)
+        print(f"{args.episodes - mismatches}/{args.episodes} episodes identical")
+        return
+
+    arrays = compile_story(args.max_depth)
+    np.savez_compressed(args.output, **arrays)
+    print(
+        f"Wrote {args.output}: {len(arrays['passage'])} states, "
+        f"{len(arrays['successor'])} choices, "
+        f"{len(arrays['string_offsets']) - 1} strings"
+    )
+
+
+if __name__ == "__main__":
+    main()
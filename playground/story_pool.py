@@ -0,0 +1,166 @@
+"""
+Process-wide pool of parsed Ink stories.
+
+Parsing the compiled story JSON is the most expensive part of starting an
+episode, so it should happen once per process instead of once per reset.
+
+The module includes:
+- state_key: Canonical identity of a story state taken from `save_state()`
+- state_knot: Knot a saved story state is waiting in
+- StoryVariables: Float32 mirror of a story's numeric VARs, kept current by observers
+- StoryTemplate: Source, initial runtime state and spare story instances for a story file
+- get_template: Cached template lookup keyed by story path and runtime
+
+Key features:
+- The story file is read and parsed once per process
+- The initial runtime state is captured right at the first choice point
+- Resets restore that state with `load_state` instead of re-parsing
+- Reward tags are compiled once along with the story
+- Released story instances are reused by later environments
+- VAR values are pushed into a preallocated vector as the story changes them
+- Stories run on bink or on the pure-Python `CompiledStory` (`runtime`);
+  saved states only load into the runtime that saved them
+"""
+
+import json
+import re
+import numpy as np
+from bink.story import Story
+from ink_runtime import CompiledStory
+from passages import PassageBuffer
+from rewards import RewardTags
+
+STORY_PATH = "story/json/story.ink.json"
+
+# Story classes by runtime name
+RUNTIMES = {"bink": Story, "compiled": CompiledStory}
+
+_VARIABLES_RE = re.compile(r'"variablesState":(\{[^{}]*\})')
+_TARGET_RE = re.compile(r'"targetPath":"([^"]*)"')
+
+
+def story_variable_names(source: str):
+    """Names of the story's global VARs holding numbers or booleans."""
+    # Global declarations live in the root container's "global decl" section
+    decl = json.loads(source)["root"][-1]["global decl"]
+    names = []
+    for i, token in enumerate(decl):
+        if isinstance(token, dict) and "VAR=" in token:
+            if isinstance(decl[i - 1], (bool, int, float)):
+                names.append(token["VAR="])
+    return names
+
+
+def state_key(saved_state: str, passage: str = "") -> str:
+    """Identity of a story state: variables, pending choices and passage.
+
+    Turn counters and visit counts are left out; the story has no loops, so
+    they never change which text or choices come next.
+    """
+    variables = _VARIABLES_RE.search(saved_state)
+    targets = _TARGET_RE.findall(saved_state)
+    return "\x1f".join([variables.group(1) if variables else "{}", *targets, passage])
+
+
+def state_knot(saved_state: str) -> str:
+    """Knot holding the choices a saved story state is waiting on."""
+    target = _TARGET_RE.search(saved_state)
+    return target.group(1).split(".", 1)[0] if target else ""
+
+
+class StoryVariables:
+    """Float32 mirror of a story's numeric VARs, kept current by observers.
+
+    Observers fire while the story continues, so reading a VAR never goes
+    through the runtime. Observers can't be removed from a bink story, which
+    is why the mirror belongs to the pooled story rather than to an env.
+    """
+
+    def __init__(self, story: Story, names, defaults):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.defaults = np.asarray(defaults, dtype=np.float32)
+        self.vector = self.defaults.copy()
+        for name in self.names:
+            story.observe_variable(name, self._on_change)
+
+    def _on_change(self, name, value):
+        self.vector[self.index[name]] = value
+
+    def sync(self, saved_state: str):
+        """Match the mirror to a state restored with `load_state`."""
+        self.vector[:] = self.defaults
+        match = _VARIABLES_RE.search(saved_state)
+        if match:
+            for name, value in json.loads(match.group(1)).items():
+                i = self.index.get(name)
+                if i is not None:
+                    self.vector[i] = value
+
+
+class StoryTemplate:
+    """Parsed story and its initial runtime state."""
+
+    def __init__(self, path: str, runtime: str = "bink"):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"unknown story runtime {runtime!r}")
+        self.path = path
+        self.runtime = runtime
+        self.story_class = RUNTIMES[runtime]
+        with open(path, "r", encoding="utf-8") as file:
+            self.source = file.read()
+        self.reward_tags = RewardTags(self.source)
+
+        # Spare parsed stories, handed out by acquire()
+        self._spare = []
+        self._variables = {}
+
+        # Run the story up to its first choice point once and remember it
+        story = self.story_class(self.source)
+        self.variable_names = story_variable_names(self.source)
+        self.variable_defaults = [
+            float(story.get_variable(name)) for name in self.variable_names
+        ]
+        self._attach(story)
+        self.initial_text = PassageBuffer().read(story)
+        self.initial_choices = tuple(story.get_current_choices())
+        self.initial_state = story.save_state()
+        self.initial_variables = self.variables(story).vector.copy()
+        self._spare.append(story)
+
+    def _attach(self, story: Story):
+        self._variables[id(story)] = StoryVariables(
+            story, self.variable_names, self.variable_defaults
+        )
+        return story
+
+    def acquire(self) -> Story:
+        """Hand out a parsed story, parsing a new one only if none are spare."""
+        if self._spare:
+            return self._spare.pop()
+        return self._attach(self.story_class(self.source))
+
+    def release(self, story: Story):
+        """Return a story to the pool so another environment can reuse it."""
+        self._spare.append(story)
+
+    def variables(self, story: Story) -> StoryVariables:
+        """VAR mirror of a story acquired from this template."""
+        return self._variables[id(story)]
+
+    def restore(self, story: Story):
+        """Rewind a story acquired from this template to its initial state."""
+        story.load_state(self.initial_state)
+        self._variables[id(story)].vector[:] = self.initial_variables
+
+
+_templates = {}
+
+
+def get_template(path: str = STORY_PATH, runtime: str = "bink") -> StoryTemplate:
+    """Return the process-wide template for a story file, parsing it on first use."""
+    key = (path, runtime)
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = StoryTemplate(path, runtime)
+    return template
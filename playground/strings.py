@@ -0,0 +1,63 @@
+"""
+Process-wide string table for passages and choice labels.
+
+The story prints a few hundred distinct passages and choices, but every env
+reads a fresh copy of each one from the runtime on every step. Interning
+keeps a single copy per distinct string and gives each one a small integer
+id, so observations and rollout buffers can carry ids instead of text.
+
+The module includes:
+- StringTable: Interns strings and hands out dense integer ids
+- get_string_table: Process-wide table shared by every env in the process
+
+Key features:
+- Ids are dense and stable for the life of the process
+- Ids resolve back to text only when something asks for it
+- Packs into a flat UTF-8 blob plus offsets for saving with numpy
+"""
+
+import numpy as np
+
+
+class StringTable:
+    """Interns strings, handing out dense integer ids."""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id) -> str:
+        return self.strings[string_id]
+
+    def intern(self, text: str) -> int:
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def lookup(self, ids) -> list:
+        """Text of each id, skipping negative (padding) ids."""
+        strings = self.strings
+        return [strings[i] for i in ids if i >= 0]
+
+    def pack(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return blob, offsets
+
+
+_table = StringTable()
+
+
+def get_string_table() -> StringTable:
+    """Return the string table shared by every env in this process.
+
+    Ids are only meaningful inside the process that handed them out.
+    """
+    return _table
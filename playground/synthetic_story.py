@@ -0,0 +1,191 @@
+"""
+Generator for large synthetic stories in compiled Ink JSON.
+
+The shipped story is small, so this emits stories of any size in the same
+format `inklecate` produces, for load-testing the env, the agent caches and
+the game UI.
+
+The module includes:
+- generate_story: Builds the compiled JSON for a random layered story
+- check: Plays a generated story in bink and CompiledStory side by side
+- main: Command-line entry point writing the story to a file
+
+Story shape:
+- Knots `k0 .. k{N-1}`; every choice leads to a later knot, so there are no
+  loops and every episode ends
+- The last `branching` knots end the story
+- Every story declares the env's item and attribute VARs, plus `v0 ..`
+  extra numeric VARs; choices set items and bump attributes/extra VARs
+
+Run from the repository root:
+    python playground/synthetic_story.py --knots 10000 --output /tmp/story.ink.json
+    python playground/synthetic_story.py --knots 1000 --output /tmp/s.json --check
+"""
+
+import argparse
+import json
+import numpy as np
+from env import ATTRIBUTE_NAMES, ITEM_NAMES
+
+INK_VERSION = 21
+
+_WORDS = (
+    "the old shrine path wind rain lantern gate stone moss whisper night "
+    "friends walk quietly under trees toward distant bells and forgotten steps"
+).split()
+
+
+def _sentence(rng, num_words: int) -> str:
+    words = rng.choice(_WORDS, size=max(num_words, 1))
+    return " ".join(words).capitalize() + "."
+
+
+def _increment(name: str):
+    return ["ev", {"VAR?": name}, 1, "+", {"VAR=": name, "re": True}, "/ev"]
+
+
+def generate_story(
+    num_knots: int = 1000,
+    branching: int = 3,
+    passage_words: int = 40,
+    num_variables: int = 8,
+    variable_rate: float = 0.5,
+    seed: int = 0,
+) -> dict:
+    """Compiled Ink JSON (as a dict) for a random layered story.
+
+    Args:
+        num_knots: Number of knots in the story
+        branching: Choices offered by every non-final knot
+        passage_words: Words of text printed on entering a knot
+        num_variables: Extra numeric VARs besides the env's items and attributes
+        variable_rate: Chance that a choice changes a VAR
+        seed: Seed for the random structure and text
+    """
+    rng = np.random.default_rng(seed)
+    extra = [f"v{i}" for i in range(num_variables)]
+    counters = [*ATTRIBUTE_NAMES, *extra]
+    window = max(2 * branching, 4)
+
+    named = {}
+    for index in range(num_knots):
+        content = []
+        # Passage split into lines of roughly ten words
+        remaining = passage_words
+        while remaining > 0:
+            length = min(remaining, 10)
+            content += [f"^{_sentence(rng, length)}", "\n"]
+            remaining -= length
+
+        if index >= num_knots - branching:
+            # Every container ends in its named-content slot, null when empty
+            content += ["^The story ends here.", "\n", "end", None]
+            named[f"k{index}"] = [content, {"#f": 1}]
+            continue
+
+        bodies = {}
+        stop = min(num_knots, index + 1 + window)
+        for choice in range(branching):
+            label = f"Option {choice + 1}: {_sentence(rng, 3)}"
+            content += ["ev", "str", f"^{label}", "/str", "/ev"]
+            content.append({"*": f".^.c-{choice}", "flg": 20})
+
+            body = ["\n"]
+            if rng.random() < variable_rate:
+                if rng.random() < 0.2:
+                    item = str(rng.choice(ITEM_NAMES))
+                    body += ["ev", True, "/ev", {"VAR=": item, "re": True}]
+                else:
+                    body += _increment(str(rng.choice(counters)))
+            target = int(rng.integers(index + 1, stop))
+            body += [f"^{_sentence(rng, 8)}", "\n", {"->": f"k{target}"}, {"#f": 5}]
+            bodies[f"c-{choice}"] = body
+        content.append(bodies)
+        named[f"k{index}"] = [content, {"#f": 1}]
+
+    declarations = ["ev", "str", "^Aie", "/str", {"VAR=": "player_name"}]
+    for name in counters:
+        declarations += [0, {"VAR=": name}]
+    for name in ITEM_NAMES:
+        declarations += [False, {"VAR=": name}]
+    declarations += ["/ev", "end", None]
+    named["global decl"] = declarations
+    named["#f"] = 1
+
+    start = [{"->": "k0"}, ["done", {"#f": 5, "#n": "g-0"}], None]
+    return {"inkVersion": INK_VERSION, "root": [start, "done", named], "listDefs": {}}
+
+
+def check(source: str, episodes: int = 20, seed: int = 0) -> int:
+    """Play random episodes in bink and CompiledStory, comparing every step.
+
+    Compares lines, choices and VARs after every choice and raises
+    AssertionError at the first difference; returns the steps checked.
+    """
+    from bink.story import Story
+    from ink_runtime import CompiledStory
+
+    rng = np.random.default_rng(seed)
+    names = [*ATTRIBUTE_NAMES, *ITEM_NAMES]
+    steps = 0
+    for episode in range(episodes):
+        ink, fast = Story(source), CompiledStory(source)
+        trail = []
+        while True:
+            where = f"in episode {episode} after choices {trail}"
+            ink_lines, fast_lines = [], []
+            while ink.can_continue():
+                ink_lines.append(ink.cont())
+            while fast.can_continue():
+                fast_lines.append(fast.cont())
+            assert ink_lines == fast_lines, f"lines differ {where}"
+            choices = list(ink.get_current_choices())
+            assert choices == fast.get_current_choices(), f"choices differ {where}"
+            for name in names:
+                assert ink.get_variable(name) == fast.get_variable(
+                    name
+                ), f"VAR {name} differs {where}"
+            if not choices:
+                break
+            choice = int(rng.integers(len(choices)))
+            ink.choose_choice_index(choice)
+            fast.choose_choice_index(choice)
+            trail.append(choice)
+            steps += 1
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Ink story.")
+    parser.add_argument("--knots", type=int, default=1000)
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--passage-words", type=int, default=40)
+    parser.add_argument("--variables", type=int, default=8)
+    parser.add_argument("--variable-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="play the story in bink and CompiledStory and compare them",
+    )
+    args = parser.parse_args()
+
+    story = generate_story(
+        args.knots,
+        args.branching,
+        args.passage_words,
+        args.variables,
+        args.variable_rate,
+        args.seed,
+    )
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(story, file, separators=(",", ":"))
+    print(f"Wrote {args.output}: {args.knots} knots")
+    if args.check:
+        steps = check(json.dumps(story), seed=args.seed)
+        print(f"bink and CompiledStory agree over {steps} choices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Table-driven version of the shrine environment.
+
+Steps through the transition table built by `story_graph.py` instead of
+interpreting Ink, so rollouts cost a few array lookups per step while
+producing the same observations, rewards and termination flags as
+`ReinforcedShrineAdventureEnv`.
+
+The module includes:
+- TabularShrineEnv: Gymnasium environment backed by a StoryGraph
+- VectorTabularShrineEnv: Batched version stepping every episode with numpy vector ops
+
+Key features:
+- No Ink runtime in the step loop
+- Items tracked as a bitmask over the graph's item names
+- Same reward shaping, truncation and invalid-action handling as the Ink env
+- Same snapshot interface (`get_state`/`set_state`/`clone`) as the Ink env
+- Batched stepping with fancy indexing over int32 transition arrays, so
+  100k episodes advance in a handful of array operations
+"""
+
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+from story_graph import StoryGraph
+from env import ATTRIBUTE_NAMES, MAX_CHOICES, action_masks
+from rewards import get_reward_spec
+
+
+def _check_graph(graph: StoryGraph, max_steps: int, max_choices: int):
+    if max_steps > graph.max_depth:
+        raise ValueError(
+            f"max_steps={max_steps} exceeds the graph's max_depth="
+            f"{graph.max_depth}; recompile with a larger --max-depth"
+        )
+    widest = int(graph.num_choices.max())
+    if widest > max_choices:
+        raise ValueError(
+            f"the story offers up to {widest} choices; max_choices={max_choices}"
+        )
+
+
+class TabularShrineEnv(gym.Env):
+    """Shrine environment stepping by transition-table lookup."""
+
+    metadata = {"render.modes": ["human"]}
+
+    def __init__(
+        self,
+        graph: StoryGraph | None = None,
+        max_steps: int = 20,
+        max_choices: int = MAX_CHOICES,
+    ):
+        super().__init__()
+        self.graph = graph if graph is not None else StoryGraph()
+        _check_graph(self.graph, max_steps, max_choices)
+
+        num_items = len(self.graph.item_names)
+        self.max_choices = max_choices
+        self._action_masks = action_masks(max_choices)
+        self.action_space = spaces.Discrete(max_choices)
+        self.observation_space = spaces.Dict(
+            {
+                "text": spaces.Text(max_length=2000),
+                "choices": spaces.Sequence(spaces.Text(max_length=100)),
+                "items": spaces.Box(
+                    low=np.array([0] * num_items),
+                    high=np.array([1] * num_items),
+                    dtype=np.float16,
+                ),
+                "attributes": spaces.Box(
+                    low=-np.inf,
+                    high=np.inf,
+                    shape=(len(ATTRIBUTE_NAMES),),
+                    dtype=np.float32,
+                ),
+                "action_mask": spaces.Box(
+                    low=0, high=1, shape=(max_choices,), dtype=np.int8
+                ),
+            }
+        )
+
+        self._item_shifts = np.arange(num_items)
+        self._attributes = self.graph.attributes(ATTRIBUTE_NAMES)
+        self.reward_spec = get_reward_spec()
+        self.prepared_mask = sum(
+            1 << self.graph.item_names.index(name)
+            for name in self.reward_spec.prepared_items
+        )
+
+        self.max_steps = max_steps
+        self.reset()
+
+    def step(self, action):
+        self.episode_steps += 1
+        truncated = self.episode_steps >= self.max_steps
+        graph = self.graph
+
+        if action >= graph.num_choices[self.state]:
+            return self._get_observation(), -1.0, True, truncated, {}
+
+        edge = graph.choice_start[self.state] + action
+        self.item_mask |= int(graph.item_bits[edge])
+        self.state = int(graph.successor[edge])
+
+        self.done = graph.num_choices[self.state] == 0 or truncated
+        reward = float(graph.dialogue_reward[self.state])
+        if not self.done:
+            reward += self.reward_spec.survival
+        elif self.is_well_prepared():
+            reward += self.reward_spec.well_prepared
+
+        return self._get_observation(), reward, self.done, truncated, {}
+
+    def is_well_prepared(self):
+        """Check if player has essential items"""
+        return self.item_mask & self.prepared_mask == self.prepared_mask
+
+    def _get_observation(self):
+        return {
+            "text": self.graph.text(self.state),
+            "choices": self.graph.choices(self.state),
+            "items": ((self.item_mask >> self._item_shifts) & 1).astype(np.float16),
+            "attributes": self._attributes[self.state],
+            "action_mask": self._action_masks[self.graph.num_choices[self.state]],
+        }
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed, options=options)
+        self.state = 0
+        self.item_mask = 0
+        self.done = False
+        self.episode_steps = 0
+        return self._get_observation(), {}
+
+    def get_state(self):
+        """Snapshot the episode so it can be restored with `set_state`."""
+        return self.state, self.item_mask, self.episode_steps, self.done
+
+    def set_state(self, state):
+        """Restore a snapshot taken with `get_state`."""
+        self.state, self.item_mask, self.episode_steps, self.done = state
+
+    def state_hash(self) -> int:
+        """Hash identifying the current state for transposition tables."""
+        return hash((self.state, self.item_mask, self.episode_steps))
+
+    def clone(self):
+        """New env sharing the graph, at the same point of the episode."""
+        env = type(self)(self.graph, self.max_steps, self.max_choices)
+        env.set_state(self.get_state())
+        return env
+
+    def render(self, mode="human"):
+        print("\nCurrent text:")
+        print(self.graph.text(self.state))
+        print("\nItems:", self._get_observation()["items"])
+        print("\nAvailable choices:")
+        for i, choice in enumerate(self.graph.choices(self.state)):
+            print(f"{i}: {choice}")
+
+
+class VectorTabularShrineEnv:
+    """Steps a whole batch of episodes at once with vector ops over the table.
+
+    Observations are arrays rather than strings:
+    - state: int32[B] graph state ids (text via `graph.text` / `graph.choices`)
+    - items: float16[B, num_items]
+    - attributes: float32[B, len(ATTRIBUTE_NAMES)]
+    - num_choices: int32[B]
+    - action_mask: int8[B, max_choices]
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        graph: StoryGraph | None = None,
+        max_steps: int = 20,
+        max_choices: int = MAX_CHOICES,
+    ):
+        self.graph = graph if graph is not None else StoryGraph()
+        _check_graph(self.graph, max_steps, max_choices)
+
+        graph = self.graph
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+
+        num_items = len(graph.item_names)
+        self._item_shifts = np.arange(num_items, dtype=np.uint8)
+        self.reward_spec = get_reward_spec()
+        self.prepared_mask = np.uint8(
+            sum(
+                1 << graph.item_names.index(name)
+                for name in self.reward_spec.prepared_items
+            )
+        )
+
+        # Transition arrays narrowed to what the hot loop needs
+        self._choice_start = graph.choice_start.astype(np.int32)
+        self._num_choices = graph.num_choices.astype(np.int32)
+        self._successor = graph.successor.astype(np.int32)
+        self._item_bits = graph.item_bits
+        self._dialogue_reward = graph.dialogue_reward.astype(np.float32)
+        self._attributes = graph.attributes(ATTRIBUTE_NAMES)
+        self._action_masks = action_masks(max_choices)
+
+        self.state = np.zeros(num_envs, dtype=np.int32)
+        self.item_mask = np.zeros(num_envs, dtype=np.uint8)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int32)
+
+    def reset(self, *, seed=None, options=None):
+        """Reset every episode to the start of the story."""
+        self.state[:] = 0
+        self.item_mask[:] = 0
+        self.episode_steps[:] = 0
+        return self._get_observation(), {}
+
+    def step(self, actions: np.ndarray):
+        """Advance every episode by one choice, auto-resetting finished ones."""
+        actions = np.asarray(actions, dtype=np.int32)
+        self.episode_steps += 1
+        truncated = self.episode_steps >= self.max_steps
+
+        # Invalid choices leave the story where it is and end the episode
+        valid = (actions >= 0) & (actions < self._num_choices[self.state])
+        edge = self._choice_start[self.state] + np.where(valid, actions, 0)
+        self.item_mask = np.where(
+            valid, self.item_mask | self._item_bits[edge], self.item_mask
+        )
+        self.state = np.where(valid, self._successor[edge], self.state)
+
+        terminal = self._num_choices[self.state] == 0
+        done = ~valid | terminal | truncated
+
+        prepared = (self.item_mask & self.prepared_mask) == self.prepared_mask
+        spec = self.reward_spec
+        shaping = np.where(
+            done, np.where(prepared, spec.well_prepared, 0.0), spec.survival
+        )
+        rewards = np.where(
+            valid, self._dialogue_reward[self.state] + shaping, -1.0
+        ).astype(np.float32)
+
+        infos = {}
+        if done.any():
+            infos = {
+                "final_state": np.where(done, self.state, -1),
+                "final_items": self._items(),
+                "final_attributes": self._attributes[self.state],
+                "_final_obs": done,
+            }
+            self.state[done] = 0
+            self.item_mask[done] = 0
+            self.episode_steps[done] = 0
+
+        return self._get_observation(), rewards, done, truncated, infos
+
+    def _items(self):
+        return ((self.item_mask[:, None] >> self._item_shifts) & 1).astype(np.float16)
+
+    def _get_observation(self):
+        return {
+            "state": self.state.copy(),
+            "items": self._items(),
+            "attributes": self._attributes[self.state],
+            "num_choices": self._num_choices[self.state],
+            "action_mask": self._action_masks[self._num_choices[self.state]],
+        }
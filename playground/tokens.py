@@ -0,0 +1,82 @@
+"""
+Pre-tokenized passages for the DistilBERT text encoder.
+
+The story only ever prints a finite set of passages, so each one needs to go
+through the tokenizer once. Envs built with `tokenize=True` look passages up
+here and hand out token arrays instead of raw text.
+
+The module includes:
+- TokenCache: LRU cache of fixed-length input ids and attention masks per passage
+- get_token_cache: Process-wide cache lookup keyed by model name and length
+
+Key features:
+- Same tokenizer settings as the agent (truncation at 256 tokens)
+- Arrays padded to a fixed length so they fit a Box observation space
+- Cached arrays are read-only and shared by every observation that uses them
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+MODEL_NAME = "distilbert-base-uncased"
+MAX_LENGTH = 256
+
+
+class TokenCache:
+    """LRU cache mapping passages to DistilBERT input ids and attention masks."""
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        max_length: int = MAX_LENGTH,
+        max_size: int = 4096,
+    ):
+        # Imported here so text observations don't require transformers
+        from transformers import DistilBertTokenizer
+
+        self.tokenizer = DistilBertTokenizer.from_pretrained(model_name)
+        self.vocab_size = self.tokenizer.vocab_size
+        self.max_length = max_length
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, text: str):
+        """Input ids (int32) and attention mask (int8) for a passage."""
+        entry = self._cache.get(text)
+        if entry is not None:
+            self._cache.move_to_end(text)
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        tokens = self.tokenizer(
+            text,
+            max_length=self.max_length,
+            truncation=True,
+            padding="max_length",
+        )
+        input_ids = np.asarray(tokens["input_ids"], dtype=np.int32)
+        attention_mask = np.asarray(tokens["attention_mask"], dtype=np.int8)
+        input_ids.flags.writeable = False
+        attention_mask.flags.writeable = False
+
+        entry = self._cache[text] = (input_ids, attention_mask)
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return entry
+
+
+_caches = {}
+
+
+def get_token_cache(
+    model_name: str = MODEL_NAME, max_length: int = MAX_LENGTH
+) -> TokenCache:
+    """Return the process-wide token cache, loading the tokenizer on first use."""
+    key = (model_name, max_length)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = TokenCache(model_name, max_length)
+    return cache
@@ -12,14 +12,19 @@ Key features:
 - Interactive matplotlib visualization
 - Automatic checkpointing
 - Memory-efficient numpy arrays
+- Success rate and moving average read from O(1) rolling windows
+- Interned passages, so rollout memory stays flat as batches grow
 - Progress logging and statistics
+- Regret against the exact optimum when the story graph is compiled
 - Entropy reduction for successful paths
 """
 
 import torch
 import numpy as np
 from env import ReinforcedShrineAdventureEnv
+from episode_stats import EpisodeStats, RollingWindow
 from agent import ShrineAgent
+from solver import load_solution
 import matplotlib.pyplot as plt
 from datetime import datetime
 import os
@@ -41,19 +46,6 @@ def plot_scores(scores, filename):
     plt.close()
 
 
-def moving_average(data, window_size=100):
-    """Calculate the moving average of the data.
-
-    Args:
-        data: Array of values to average
-        window_size: Size of sliding window
-
-    Returns:
-        Array of moving averages
-    """
-    return np.convolve(data, np.ones(window_size) / window_size, mode="valid")
-
-
 def main():
     """Main training loop.
 
@@ -73,11 +65,25 @@ def main():
     os.makedirs(results_dir, exist_ok=True)
 
     # Initialize environment and agent
-    env = ReinforcedShrineAdventureEnv()
+    # Passages come pre-tokenized, so the tokenizer stays out of the loop, and
+    # as string ids, so the rollout buffer stores an int per passage
+    success_threshold = 20.0
+    env = EpisodeStats(
+        ReinforcedShrineAdventureEnv(tokenize=True, intern=True),
+        window=50,
+        success_threshold=success_threshold,
+    )
     agent = ShrineAgent(
         state_size=773, action_size=4, batch_size=256
     )  # Increased from 192
 
+    # Exact optimum for regret reporting, if the story graph has been compiled
+    try:
+        solution = load_solution(max_choices=env.unwrapped.max_choices)
+        print(f"Optimal return: {solution.optimal_return:.2f}")
+    except FileNotFoundError:
+        solution = None
+
     # Training parameters
     num_episodes = 1000
     initial_entropy_coef = 0.02
@@ -107,12 +113,11 @@ def main():
 
     window_size = 10
     scores = np.zeros(num_episodes, dtype=np.float16)
-    moving_avg = np.array([], dtype=np.float16)
+    moving_avg = np.zeros(num_episodes, dtype=np.float16)
+    score_window = RollingWindow(window_size)
+    avg_min, avg_max = float("inf"), float("-inf")
 
-    # Track successful episodes
-    success_history = []
     best_reward = float("-inf")
-    success_threshold = 20.0
     current_entropy_coef = initial_entropy_coef
 
     # Train the agent
@@ -126,17 +131,18 @@ def main():
 
         while not done and not truncated:
             action, log_prob, value = agent.act(observation)
-            next_observation, reward, done, truncated, _ = env.step(action)
 
             # Record episode details
-            if action < len(observation["choices"]):
-                episode_choices.append(observation["choices"][action])
+            choices = env.unwrapped.current_choices
+            if action < len(choices):
+                episode_choices.append(choices[action])
+
+            next_observation, reward, done, truncated, _ = env.step(action)
 
             agent.memory.add(
                 observation,
                 action,
                 reward,
-                next_observation,
                 done or truncated,
                 log_prob,
                 value,
@@ -145,18 +151,13 @@ def main():
             total_reward += reward
             observation = next_observation
 
-            if len(agent.memory.states) >= agent.batch_size:
+            if len(agent.memory) >= agent.batch_size:
                 # Update with current entropy coefficient
                 agent.update(entropy_coef=current_entropy_coef)
 
-        # Track successful episodes
-        was_successful = total_reward > success_threshold
-        success_history.append(was_successful)
-
-        # Calculate success rate over recent episodes
-        window = 50  # or another suitable size
-        if len(success_history) >= window:
-            recent_success_rate = sum(success_history[-window:]) / window
+        # Success rate over the last 50 episodes, kept by the wrapper
+        if env.successes.full():
+            recent_success_rate = env.success_rate
 
             # Adjust entropy based on success rate
             if recent_success_rate > 0.7:  # if successful more than 70% of time
@@ -177,26 +178,36 @@ def main():
             print(f"Current entropy coefficient: {current_entropy_coef:.6f}")
 
         scores[episode] = total_reward
+        score_window.push(total_reward)
 
         # Update the plots
         scores_line.set_data(np.arange(episode + 1), scores[: episode + 1])
 
-        if episode >= window_size - 1:
-            moving_avg = moving_average(scores[: episode + 1], window_size)
-            avg_line.set_data(np.arange(window_size - 1, episode + 1), moving_avg)
+        if score_window.full():
+            average = score_window.mean
+            moving_avg[episode] = average
+            avg_min, avg_max = min(avg_min, average), max(avg_max, average)
+            avg_line.set_data(
+                np.arange(window_size - 1, episode + 1),
+                moving_avg[window_size - 1 : episode + 1],
+            )
 
         # Adjust y-axis limits if needed
-        ax1.set_ylim(
-            np.min(scores[: episode + 1]) - 1, np.max(scores[: episode + 1]) + 1
-        )
-        if episode >= window_size - 1:
-            ax2.set_ylim(np.min(moving_avg) - 1, np.max(moving_avg) + 1)
+        ax1.set_ylim(env.worst_return - 1, env.best_return + 1)
+        if score_window.full():
+            ax2.set_ylim(avg_min - 1, avg_max + 1)
 
         fig.canvas.draw()
         fig.canvas.flush_events()
 
         if episode % 10 == 0:
-            print(f"Episode: {episode}, Score: {total_reward}")
+            if solution is not None:
+                print(
+                    f"Episode: {episode}, Score: {total_reward}, "
+                    f"Regret: {solution.regret(total_reward):.2f}"
+                )
+            else:
+                print(f"Episode: {episode}, Score: {total_reward}")
             torch.cuda.empty_cache()
 
     plt.ioff()  # Turn off interactive mode
@@ -225,7 +236,10 @@ def main():
         f"Average score over last {window_size} episodes: {np.mean(scores[-window_size:]):.2f}"
     )
     print(f"Best score: {np.max(scores):.2f}")
-    print(f"Success rate: {sum(success_history)/len(success_history)*100:.1f}%")
+    if solution is not None:
+        recent = np.mean(scores[-window_size:])
+        print(f"Regret over last {window_size} episodes: {solution.regret(recent):.2f}")
+    print(f"Success rate: {env.overall_success_rate * 100:.1f}%")
     print(f"Final entropy coefficient: {current_entropy_coef:.6f}")
 
     plt.show()  # Keep the final plot window open
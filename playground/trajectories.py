@@ -0,0 +1,231 @@
+"""
+Compact episode recording and replay.
+
+The story is deterministic, so an episode is fully described by how it was
+reset and the actions taken. Recording only those (plus the per-step reward
+and end flags) keeps logs to a few dozen bytes per episode, and any
+observation can be rebuilt later by re-driving the story.
+
+The module includes:
+- RecordEpisodes: Env wrapper appending every episode to a binary log
+- TrajectoryLog: Reader with random access to the recorded episodes
+- replay: Re-drives an env through a recorded episode
+
+Log layout, one record per episode, little-endian:
+- seed: int64
+- length: uint32 number of steps
+- meta_size: uint32 byte size of the metadata
+- metadata: UTF-8 JSON of the reset `options`, and of the start knot and
+  state key when the env resumed from a start-state bank; empty otherwise
+- actions: uint16[length]
+- rewards: float32[length]
+- flags: uint8[length], bit 0 terminated, bit 1 truncated
+
+Reset options must be JSON-serializable. Replaying an episode that began in
+a banked start state needs an env holding the bank it was recorded with.
+
+Run from the repository root:
+    python playground/trajectories.py LOG --episode 3    # print one episode
+    python playground/trajectories.py LOG --rescore      # replay every episode
+    python playground/trajectories.py LOG --rescore --start-states story/json/story.starts.json
+"""
+
+import argparse
+import json
+import struct
+from array import array
+from collections import namedtuple
+import gymnasium as gym
+import numpy as np
+from story_pool import state_key
+
+_HEADER = struct.Struct("<qII")
+TERMINATED = 1
+TRUNCATED = 2
+
+Episode = namedtuple(
+    "Episode",
+    ["seed", "actions", "rewards", "flags", "options", "start_knot", "start_key"],
+)
+
+
+class RecordEpisodes(gym.Wrapper):
+    """Appends each episode's reset, actions, rewards and end flags to a log."""
+
+    def __init__(self, env, path: str, seed: int | None = None):
+        super().__init__(env)
+        self.path = path
+        self._file = open(path, "ab")
+        self._seeds = np.random.default_rng(seed)
+        self._seed = None
+        self._meta = b""
+        self._actions = array("H")
+        self._rewards = []
+        self._flags = bytearray()
+
+    def reset(self, *, seed=None, options=None):
+        self._flush()
+        # Every episode gets a concrete seed so replays start the same way
+        if seed is None:
+            seed = int(self._seeds.integers(2**63 - 1))
+        self._seed = seed
+        observation, info = self.env.reset(seed=seed, options=options)
+
+        meta = {"options": options} if options else {}
+        if "start_knot" in info:
+            base = self.env.unwrapped
+            meta["start_knot"] = info["start_knot"]
+            meta["start_key"] = state_key(base.story.save_state(), base.current_text)
+        self._meta = json.dumps(meta).encode("utf-8") if meta else b""
+        return observation, info
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._actions.append(int(action))
+        self._rewards.append(reward)
+        self._flags.append(TERMINATED * bool(terminated) | TRUNCATED * bool(truncated))
+        if terminated or truncated:
+            self._flush()
+        return observation, reward, terminated, truncated, info
+
+    def _flush(self):
+        """Write the current episode, if it has any steps."""
+        if self._actions:
+            header = _HEADER.pack(self._seed, len(self._actions), len(self._meta))
+            self._file.write(header + self._meta)
+            self._file.write(np.asarray(self._actions, dtype="<u2").tobytes())
+            self._file.write(np.asarray(self._rewards, dtype="<f4").tobytes())
+            self._file.write(self._flags)
+            self._file.flush()
+        del self._actions[:]
+        self._rewards.clear()
+        self._flags.clear()
+
+    def close(self):
+        self._flush()
+        self._file.close()
+        super().close()
+
+
+class TrajectoryLog:
+    """Random access to the episodes in a log written by RecordEpisodes."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._data = file.read()
+
+        # One pass over the headers to find where each episode starts
+        self._offsets = []
+        offset = 0
+        while offset + _HEADER.size <= len(self._data):
+            _, length, meta_size = _HEADER.unpack_from(self._data, offset)
+            end = offset + _HEADER.size + meta_size + 7 * length
+            if end > len(self._data):
+                break  # partially written last record
+            self._offsets.append(offset)
+            offset = end
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Episode:
+        offset = self._offsets[index]
+        seed, length, meta_size = _HEADER.unpack_from(self._data, offset)
+        start = offset + _HEADER.size
+        data = self._data
+        meta = json.loads(data[start : start + meta_size]) if meta_size else {}
+        start += meta_size
+        actions = np.frombuffer(data, "<u2", length, start)
+        rewards = np.frombuffer(data, "<f4", length, start + 2 * length)
+        flags = np.frombuffer(data, np.uint8, length, start + 6 * length)
+        return Episode(
+            seed,
+            actions,
+            rewards,
+            flags,
+            meta.get("options"),
+            meta.get("start_knot"),
+            meta.get("start_key"),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def replay(env, episode: Episode):
+    """Yield (observation, reward, terminated, truncated) for a recorded episode.
+
+    The reset observation comes first, with a reward of 0. An episode that
+    began in a banked start state resumes from that state, looked up by key
+    in the env's bank.
+    """
+    observation, _ = env.reset(seed=episode.seed, options=episode.options)
+    if episode.start_key is not None:
+        base = env.unwrapped
+        base.set_state(_start_snapshot(base.start_states, episode))
+        base.episode_steps = 0
+        observation = base.observe()
+    yield observation, 0.0, False, False
+    for action in episode.actions:
+        observation, reward, terminated, truncated, _ = env.step(int(action))
+        yield observation, reward, terminated, truncated
+
+
+def _start_snapshot(bank, episode: Episode):
+    """The bank's snapshot of the state an episode started in."""
+    snapshots = bank.states.get(episode.start_knot, ()) if bank is not None else ()
+    for snapshot in snapshots:
+        if state_key(snapshot[0], snapshot[4]) == episode.start_key:
+            return snapshot
+    raise ValueError(
+        f"episode started in a state of knot {episode.start_knot!r} "
+        "that the env's start-state bank doesn't hold"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a trajectory log.")
+    parser.add_argument("log")
+    parser.add_argument("--episode", type=int, help="print one episode")
+    parser.add_argument(
+        "--rescore", action="store_true", help="compare logged and current returns"
+    )
+    parser.add_argument(
+        "--start-states", metavar="PATH", help="start-state bank the log was made with"
+    )
+    args = parser.parse_args()
+
+    from env import ReinforcedShrineAdventureEnv
+    from start_states import StartStateBank
+
+    log = TrajectoryLog(args.log)
+    bank = StartStateBank.load(args.start_states) if args.start_states else None
+    env = ReinforcedShrineAdventureEnv(start_states=bank)
+    print(f"{len(log)} episodes")
+
+    if args.episode is not None:
+        episode = log[args.episode]
+        print(f"seed {episode.seed}, {len(episode.actions)} steps")
+        steps = replay(env, episode)
+        observation, *_ = next(steps)
+        for action, (next_observation, reward, terminated, truncated) in zip(
+            episode.actions, steps
+        ):
+            print("\n" + observation["text"].strip())
+            choices = observation["choices"]
+            label = choices[action] if action < len(choices) else "<invalid>"
+            print(f"> {label}  (reward {reward:+.2f})")
+            observation = next_observation
+        print("\n" + observation["text"].strip())
+
+    if args.rescore:
+        changed = 0
+        for episode in log:
+            rewards = [step[1] for step in replay(env, episode)][1:]
+            changed += not np.allclose(rewards, episode.rewards)
+        print(f"{changed}/{len(log)} episodes score differently now")
+
+
+if __name__ == "__main__":
+    main()
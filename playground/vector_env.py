@@ -0,0 +1,158 @@
+"""
+Batched, in-process vector environment for the shrine story.
+
+Steps N `ReinforcedShrineAdventureEnv` instances in lockstep so the agent can
+run a single batched forward pass per tick instead of N batch-size-1 passes.
+
+The module includes:
+- ShrineVectorEnv: `SyncVectorEnv`-compatible vector env with stacked observations
+
+Observations are batched as:
+- text: list of N passage strings, or input_ids/attention_mask (N, L)
+  arrays for envs built with `tokenize=True`
+- choices: list of N choice lists
+- text_id: (N,) int32 and choice_ids: (N, max_choices) int32 arrays instead of
+  text and choices, for envs built with `intern=True`
+- items: (N, 5) array
+- attributes: (N, 4) array
+- action_mask: (N, max_choices) int8 array
+- history: list of N passage tuples, when the envs keep one
+- frame: (N, H, W, 3) uint8 view of one shared offscreen surface, for envs
+  built with `frame_size`; valid until the next step
+
+Key features:
+- Lockstep stepping of every sub-environment
+- Same-step auto-reset: a finished sub-environment is reset right away and its
+  last observation and info are reported in `infos["final_obs"]` and
+  `infos["final_info"]`
+- Per-env infos merged like gymnasium's `SyncVectorEnv`: `infos[key]` holds
+  each env's value and `infos["_key"]` masks the envs that reported it
+- Rewards, terminations and truncations returned as numpy arrays
+- All sub-environments share one parsed story template
+- Snapshots restored in bulk (`set_states`) for batched rollouts from
+  searched states
+"""
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+from env import ReinforcedShrineAdventureEnv
+from frames import FrameRenderer
+
+
+class ShrineVectorEnv(VectorEnv):
+    """Vector environment holding N shrine stories stepped in lockstep."""
+
+    metadata = {"render.modes": []}
+
+    def __init__(self, num_envs: int, env_fn=ReinforcedShrineAdventureEnv):
+        super().__init__()
+        self.envs = [env_fn() for _ in range(num_envs)]
+        self.num_envs = num_envs
+
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # Every env renders into its own slot of one surface, so frames need no stacking
+        self.frames = None
+        first = self.envs[0]
+        if first.frames is not None:
+            self.frames = FrameRenderer(
+                first.frame_size, num_envs, first.frames.scene_size
+            )
+            for slot, env in enumerate(self.envs):
+                env.use_frames(self.frames, slot)
+
+        self._rewards = np.zeros(num_envs, dtype=np.float32)
+        self._terminations = np.zeros(num_envs, dtype=np.bool_)
+        self._truncations = np.zeros(num_envs, dtype=np.bool_)
+
+    def reset(self, *, seed=None, options=None):
+        """Reset every sub-environment and return the stacked observations."""
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+
+        observations = []
+        infos = {}
+        for i, (env, env_seed) in enumerate(zip(self.envs, seeds)):
+            observation, info = env.reset(seed=env_seed, options=options)
+            observations.append(observation)
+            infos = self._add_info(infos, info, i)
+        return self._stack(observations), infos
+
+    def set_states(self, states):
+        """Restore `get_state` snapshots into the first len(states) sub-envs.
+
+        Returns the stacked observations of every sub-environment, e.g. to
+        play searched states out in lockstep.
+        """
+        for env, state in zip(self.envs, states):
+            env.set_state(state)
+        return self._stack([env.observe() for env in self.envs])
+
+    def step(self, actions):
+        """Step every sub-environment once, auto-resetting finished ones."""
+        observations = []
+        infos = {}
+
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, reward, terminated, truncated, info = env.step(int(action))
+            self._rewards[i] = reward
+            self._terminations[i] = terminated
+            self._truncations[i] = truncated
+
+            if terminated or truncated:
+                if self.frames is not None:
+                    # The reset below draws over the slot
+                    observation["frame"] = observation["frame"].copy()
+                infos = self._add_info(
+                    infos, {"final_obs": observation, "final_info": info}, i
+                )
+                observation, info = env.reset()
+
+            observations.append(observation)
+            infos = self._add_info(infos, info, i)
+
+        return (
+            self._stack(observations),
+            self._rewards.copy(),
+            self._terminations.copy(),
+            self._truncations.copy(),
+            infos,
+        )
+
+    def _stack(self, observations):
+        """Stack per-env observation dicts into one batched dict."""
+        batch = {
+            "items": np.stack([obs["items"] for obs in observations]),
+            "attributes": np.stack([obs["attributes"] for obs in observations]),
+            "action_mask": np.stack([obs["action_mask"] for obs in observations]),
+        }
+        if "choices" in observations[0]:
+            batch["choices"] = [obs["choices"] for obs in observations]
+        else:
+            batch["text_id"] = np.array([obs["text_id"] for obs in observations])
+            batch["choice_ids"] = np.stack([obs["choice_ids"] for obs in observations])
+        if "text" in observations[0]:
+            batch["text"] = [obs["text"] for obs in observations]
+        elif "input_ids" in observations[0]:
+            batch["input_ids"] = np.stack([obs["input_ids"] for obs in observations])
+            batch["attention_mask"] = np.stack(
+                [obs["attention_mask"] for obs in observations]
+            )
+        if "history" in observations[0]:
+            batch["history"] = [obs["history"] for obs in observations]
+        if self.frames is not None:
+            batch["frame"] = self.frames.frames
+        return batch
+
+    def close_extras(self, **kwargs):
+        """Release every sub-environment's story back to the pool."""
+        for env in self.envs:
+            env.close()